@@ -0,0 +1,103 @@
+"""Benchmark for the hand-built responses of the hottest endpoints,
+`GET /api/games/<id>/` and `POST /api/moves/`.
+
+Measures requests per second through the full Django stack in a
+single process, i.e. for one uwsgi worker, with the responses built
+by hand and rendered with orjson, and with the ModelSerializer and
+stock JSON encoding used before. orjson is in requirements.txt:
+without it, the hand-built responses fall back to the stock encoder
+too, and the results show the gain from skipping the serializers
+alone.
+
+Needs the database settings used by the app, as it creates
+(and afterwards destroys) a test database.
+
+Usage (from the project root):
+
+    python -m benchmarks.api_responses
+"""
+import os
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sweeper.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment
+from rest_framework import viewsets
+from rest_framework.test import APIClient
+
+from restapi import renderers
+from restapi.models import Game, Move
+from restapi.views import GameViewSet, MoveViewSet
+
+# (rows, cols) of the boards used
+BOARDS = [(9, 9), (20, 20)]
+
+# duration of each measurement, in seconds
+DURATION = 2
+
+
+@contextmanager
+def serializer_responses():
+    """Build and render responses the way they were
+    before the hand-built responses were added."""
+    with mock.patch.object(GameViewSet, 'retrieve', viewsets.ModelViewSet.retrieve), \
+            mock.patch.object(MoveViewSet, 'create', viewsets.ModelViewSet.create), \
+            mock.patch.object(renderers, 'orjson', None):
+        yield
+
+
+def bench(request) -> float:
+    """Returns the number of requests per second."""
+    for _ in range(20):
+        request()
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        request()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    runner = DiscoverRunner(verbosity=0)
+    setup_test_environment()
+    old_config = runner.setup_databases()
+
+    try:
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('benchmark'))
+
+        print(f'{"endpoint":>18} {"board":>7} {"before (req/s)":>15} {"after (req/s)":>14}')
+        for num_rows, num_cols in BOARDS:
+            game = Game.objects.create(
+                owner=User.objects.get(username='benchmark'),
+                num_rows=num_rows, num_cols=num_cols, num_mines=10)
+
+            def get_game():
+                assert client.get(f'/api/games/{game.id}/').status_code == 200
+
+            def post_move():
+                # toggles a flag, so the game never ends
+                assert client.post('/api/moves/', {
+                    'game_id': game.id, 'row': 0, 'col': 0, 'action': Move.FLAG,
+                }, format='json').status_code == 201
+
+            for name, request in [('GET /api/games/x/', get_game), ('POST /api/moves/', post_move)]:
+                with serializer_responses():
+                    before = bench(request)
+                after = bench(request)
+                print(f'{name:>18} {num_rows:>3}x{num_cols:<3} {before:>15.0f} {after:>14.0f}')
+    finally:
+        runner.teardown_databases(old_config)
+
+
+if __name__ == '__main__':
+    main()
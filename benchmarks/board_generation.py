@@ -0,0 +1,38 @@
+"""Benchmark for board generation (SweeperGame.set_mines).
+
+Generates boards of increasing size and mine density.
+
+Usage (from the project root):
+
+    python -m benchmarks.board_generation
+"""
+import timeit
+
+from restapi.sweepergame import SweeperGame
+
+BOARDS = [
+    (9, 9, 10),
+    (16, 16, 40),
+    (20, 20, 99),
+    (20, 20, 399),
+    (200, 200, 8000),
+    (1000, 1000, 200000),
+]
+
+
+def bench(num_rows: int, num_cols: int, num_mines: int) -> float:
+    """Returns the best time (in seconds) to generate one board."""
+    timer = timeit.Timer(lambda: SweeperGame(num_rows, num_cols, num_mines))
+    number, _ = timer.autorange()
+    return min(timer.repeat(number=number, repeat=3)) / number
+
+
+def main():
+    print(f'{"board":>11} {"mines":>7} {"time (us)":>11}')
+    for num_rows, num_cols, num_mines in BOARDS:
+        seconds = bench(num_rows, num_cols, num_mines)
+        print(f'{num_rows:>5} x{num_cols:>5} {num_mines:>7} {seconds*1e6:>11.0f}')
+
+
+if __name__ == '__main__':
+    main()
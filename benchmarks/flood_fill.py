@@ -0,0 +1,38 @@
+"""Benchmark for the flood fill in SweeperGame.reveal_tile.
+
+Reveals one corner of mine-free square boards of increasing size,
+which floods the whole board. If the fill is linear in the revealed
+area, the time per revealed tile should stay roughly constant.
+
+Usage (from the project root):
+
+    python -m benchmarks.flood_fill
+"""
+import timeit
+
+from restapi.sweepergame import SweeperGame
+
+SIZES = [50, 100, 200, 500, 1000]
+
+
+def bench(size: int, repeat: int = 3) -> float:
+    """Returns the best time (in seconds) to flood a size x size board."""
+    empty = SweeperGame(size, size, 0)
+
+    def run():
+        empty.snapshot().apply_reveal(0, 0)
+
+    # snapshot() is included in the timing, but it is a single buffer copy
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    print(f'{"board":>11} {"tiles":>9} {"total (ms)":>11} {"ns/tile":>8}')
+    for size in SIZES:
+        seconds = bench(size)
+        tiles = size * size
+        print(f'{size:>5} x{size:>5} {tiles:>9} {seconds*1e3:>11.1f} {seconds/tiles*1e9:>8.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+import struct
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from restapi.fields import PackedBoard
+from restapi.sweepergame import SweeperGame
+
+class GameCache():
+    """Per-process LRU cache of the latest state of recently
+    played games, along with the game version it belongs to.
+
+    Game versions are incremented on every move and rewind,
+    so when another process has changed a game, the version
+    loaded from the database no longer matches the cached one
+    and the cached state is not used.
+
+    Callers modify the games they get in place, so they
+    are given copies of the cached ones.
+    """
+
+    # rough size in bytes of a cached SweeperGame, besides its board
+    ENTRY_OVERHEAD = 512
+
+    def __init__(self, max_size: int, max_bytes: int):
+        """
+        Args:
+            max_size - Maximum number of games to keep.
+            max_bytes - Maximum total size of the games to keep,
+                as estimated by `entry_size`.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def entry_size(cls, game: SweeperGame) -> int:
+        return len(game.board) + cls.ENTRY_OVERHEAD
+
+    def get(self, game_id: int, version: int) -> Optional[SweeperGame]:
+        """Returns a copy of the cached state of the game
+        at `version`, or None if it is not cached."""
+        with self._lock:
+            cached_version, game = self._entries.get(game_id, (None, None))
+            if cached_version != version:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(game_id)
+        return game.snapshot()
+
+    def put(self, game_id: int, version: int, game: SweeperGame):
+        """Cache the state of the game at `version`, replacing
+        any older state of the same game.
+        The game must not be modified afterwards."""
+        size = self.entry_size(game)
+        if size > self.max_bytes or self.max_size <= 0:
+            return
+
+        with self._lock:
+            old_version, old = self._entries.pop(game_id, (None, None))
+            if old is not None:
+                # keep the newest state, in case puts race
+                if old_version > version:
+                    self._entries[game_id] = (old_version, old)
+                    return
+                self.size_bytes -= self.entry_size(old)
+
+            self._entries[game_id] = (version, game)
+            self.size_bytes += size
+
+            while len(self._entries) > self.max_size or self.size_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= self.entry_size(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'size_bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class SharedGameCache():
+    """Latest state of recently played games, shared by all worker
+    processes through one of the caches in `settings.CACHES`.
+
+    Each game is stored under its database name and id, as its
+    version (a 4 byte header) followed by the board as stored by
+    PackedBoardField. Games of other databases using the same
+    cache, such as the test database, have their own keys.
+    As with GameCache, a state is only used if its version
+    matches the one loaded from the database.
+
+    Without a cache alias, the shared cache is disabled:
+    nothing is stored, and every lookup misses.
+    """
+
+    KEY_PREFIX = 'sweeper:'
+    # game version, as an unsigned 32-bit big-endian integer
+    HEADER = struct.Struct('>I')
+
+    def __init__(self, alias: Optional[str], timeout: int):
+        """
+        Args:
+            alias - Name of the cache in `settings.CACHES`,
+                or None to disable the shared cache.
+            timeout - Number of seconds after which states expire.
+        """
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, game_id: int) -> str:
+        return '%s%s:game:%d' % (self.KEY_PREFIX, connection.settings_dict['NAME'], game_id)
+
+    def get(self, game_id: int, version: int) -> Optional[SweeperGame]:
+        if self.alias is None:
+            return None
+
+        value = self.cache.get(self.key(game_id))
+
+        if value is None or self.HEADER.unpack_from(value)[0] != version:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return PackedBoard(value[self.HEADER.size:]).to_game()
+
+    def put(self, game_id: int, version: int, game: SweeperGame):
+        if self.alias is None:
+            return
+
+        value = self.HEADER.pack(version) + PackedBoard.from_game(game).raw
+        self.cache.set(self.key(game_id), value, self.timeout)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+game_cache = GameCache(settings.SWEEPER_GAME_CACHE_SIZE, settings.SWEEPER_GAME_CACHE_MAX_BYTES)
+shared_game_cache = SharedGameCache(
+    settings.SWEEPER_SHARED_GAME_CACHE, settings.SWEEPER_SHARED_GAME_CACHE_TIMEOUT)
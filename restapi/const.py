@@ -2,4 +2,13 @@ MIN_ROWS = 6
 MIN_COLS = 6
 MAX_ROWS = 20
 MAX_COLS = 20
-MIN_MINES = 2
\ No newline at end of file
+MIN_MINES = 2
+
+# Maximum number of moves in one batch submission
+MAX_BATCH_MOVES = 500
+
+# Number of board shapes whose neighbor tables are kept in memory
+NEIGHBOR_TABLE_CACHE_SIZE = 64
+
+# Number of seeded boards kept in memory by each process
+SEEDED_BOARD_CACHE_SIZE = 256
@@ -0,0 +1,114 @@
+import struct
+from itertools import groupby
+from typing import List
+
+from django.db import models
+
+from restapi.sweepergame import SweeperGame
+
+# rows and columns, as unsigned 16-bit big-endian integers
+HEADER = struct.Struct('>HH')
+
+
+class PackedBoard():
+    """Board as stored by PackedBoardField.
+
+    A 4 byte shape header (see `HEADER`) followed by one byte
+    per tile, in the same row-major layout as `SweeperGame.board`.
+    Nothing is decoded until one of the accessors is used.
+    """
+    __slots__ = ('raw',)
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+
+    @staticmethod
+    def from_game(game: SweeperGame):
+        return PackedBoard(HEADER.pack(game.num_rows, game.num_cols) + game.board)
+
+    @staticmethod
+    def from_tiles(tiles: List[List[int]]):
+        return PackedBoard.from_game(SweeperGame.from_tile_arr(tiles))
+
+    @property
+    def shape(self):
+        """(num_rows, num_cols)"""
+        return HEADER.unpack_from(self.raw)
+
+    @property
+    def board(self) -> bytes:
+        """Flat, row-major tile values."""
+        return self.raw[HEADER.size:]
+
+    @property
+    def tiles(self) -> List[List[int]]:
+        """The board as a list of rows of tile values."""
+        _, num_cols = self.shape
+        board = self.board
+        return [list(board[i:i+num_cols]) for i in range(0, len(board), num_cols)]
+
+    def to_rle(self) -> str:
+        """Run-length encode the board as "ROWSxCOLS:" followed by
+        comma separated runs of tile values in row-major order.
+        A run is "value*count", or just "value" for a single tile.
+        """
+        runs = []
+        for value, run in groupby(self.board):
+            count = sum(1 for _ in run)
+            runs.append(f'{value}*{count}' if count > 1 else str(value))
+        return '%dx%d:' % self.shape + ','.join(runs)
+
+    @staticmethod
+    def from_rle(encoded: str):
+        """Inverse of `to_rle`.
+
+        Raises:
+            ValueError - if `encoded` is malformed.
+        """
+        shape, _, runs = encoded.partition(':')
+        num_rows, num_cols = (int(n) for n in shape.split('x'))
+
+        board = bytearray()
+        for run in runs.split(','):
+            value, _, count = run.partition('*')
+            board += bytes([int(value)]) * int(count or 1)
+
+        if len(board) != num_rows * num_cols:
+            raise ValueError('Expected %d tiles, got %d' % (num_rows * num_cols, len(board)))
+        return PackedBoard(HEADER.pack(num_rows, num_cols) + bytes(board))
+
+    def to_game(self) -> SweeperGame:
+        num_rows, num_cols = self.shape
+        return SweeperGame.from_board(num_rows, num_cols, self.board)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedBoard) and self.raw == other.raw
+
+    def __repr__(self):
+        return '<PackedBoard %dx%d>' % self.shape
+
+
+class PackedBoardField(models.BinaryField):
+    """Stores a board as `bytea`: one byte per tile plus a shape header,
+    instead of a 2D integer array. Values are loaded as PackedBoard
+    objects. Nested lists of tiles are also accepted when saving.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return PackedBoard(bytes(value))
+
+    def to_python(self, value):
+        if value is None or isinstance(value, PackedBoard):
+            return value
+        if isinstance(value, list):
+            return PackedBoard.from_tiles(value)
+        return PackedBoard(bytes(super().to_python(value)))
+
+    def get_prep_value(self, value):
+        if isinstance(value, list):
+            value = PackedBoard.from_tiles(value)
+        if isinstance(value, PackedBoard):
+            value = value.raw
+        return super().get_prep_value(value)
@@ -0,0 +1,13 @@
+import django_filters
+
+from restapi.models import Move
+
+class MoveFilter(django_filters.FilterSet):
+    """Filters moves by the id of their game. Unlike the default
+    filter for foreign keys, the game is not fetched to validate it.
+    """
+    game_id = django_filters.NumberFilter(field_name='game_id')
+
+    class Meta:
+        model = Move
+        fields = ['game_id']
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+import django.contrib.postgres.fields
+
+from restapi.sweepergame import SweeperGame
+
+
+def materialize_current_state(apps, schema_editor):
+    """Replay the move history of existing games once,
+    so that the latest state is available without replays.
+    """
+    Game = apps.get_model('restapi', 'Game')
+    Move = apps.get_model('restapi', 'Move')
+
+    for game_obj in Game.objects.all().iterator():
+        game = SweeperGame.from_tile_arr(game_obj.tiles)
+        move_count = 0
+
+        for move in Move.objects.filter(game_id=game_obj).order_by('order'):
+            if move.action == 'R':
+                game = game.reveal_tile(move.row, move.col)
+            elif move.action == 'F':
+                game = game.set_flag(move.row, move.col)
+            move_count += 1
+
+        game_obj.current_tiles = game.tiles
+        game_obj.status = game.status.value
+        game_obj.move_count = move_count
+        game_obj.save(update_fields=['current_tiles', 'status', 'move_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0005_auto_20210605_1416'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='current_tiles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='move_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of moves applied to the game so far.'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='status',
+            field=models.IntegerField(choices=[(0, 'In progress'), (1, 'User won'), (2, 'User lost')], default=0, help_text='Game status after the latest move has been applied.'),
+        ),
+        migrations.RunPython(materialize_current_state, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='game',
+            name='current_tiles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), help_text='Board state after the latest move has been applied.', size=None),
+        ),
+    ]
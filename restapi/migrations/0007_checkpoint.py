@@ -0,0 +1,56 @@
+# Generated by Django 3.2.4 on 2026-10-18 04:57
+
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+from restapi.sweepergame import SweeperGame
+
+
+def create_checkpoints(apps, schema_editor):
+    """Take checkpoints for the existing move history of every game."""
+    Game = apps.get_model('restapi', 'Game')
+    Move = apps.get_model('restapi', 'Move')
+    Checkpoint = apps.get_model('restapi', 'Checkpoint')
+    interval = settings.SWEEPER_CHECKPOINT_INTERVAL
+
+    for game_obj in Game.objects.filter(move_count__gte=interval).iterator():
+        game = SweeperGame.from_tile_arr(game_obj.tiles)
+        checkpoints = []
+
+        for move in Move.objects.filter(game_id=game_obj).order_by('order'):
+            if move.action == 'R':
+                game = game.reveal_tile(move.row, move.col)
+            elif move.action == 'F':
+                game = game.set_flag(move.row, move.col)
+
+            if (move.order + 1) % interval == 0:
+                checkpoints.append(Checkpoint(
+                    game_id=game_obj, order=move.order, tiles=game.tiles))
+
+        Checkpoint.objects.bulk_create(checkpoints)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0006_game_current_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Checkpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(help_text='Order of the move after which the snapshot was taken')),
+                ('tiles', django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), size=None)),
+                ('game_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='restapi.game')),
+            ],
+            options={
+                'ordering': ['game_id', 'order'],
+                'unique_together': {('game_id', 'order')},
+            },
+        ),
+        migrations.RunPython(create_checkpoints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.4 on 2026-10-18 04:58
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+from restapi.sweepergame import SweeperGame
+
+
+def record_move_deltas(apps, schema_editor):
+    """Replay existing games once to record the delta of every move."""
+    Game = apps.get_model('restapi', 'Game')
+    Move = apps.get_model('restapi', 'Move')
+
+    for game_obj in Game.objects.filter(move_count__gt=0).iterator():
+        game = SweeperGame.from_tile_arr(game_obj.tiles)
+        moves = list(Move.objects.filter(game_id=game_obj).order_by('order'))
+
+        for move in moves:
+            if move.action == 'R':
+                game = game.reveal_tile(move.row, move.col)
+            elif move.action == 'F':
+                game = game.set_flag(move.row, move.col)
+            move.delta = game.delta
+
+        Move.objects.bulk_update(moves, ['delta'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0007_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='move',
+            name='delta',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, help_text='Indices (row * num_cols + col) of the tiles changed by this move.', size=None),
+        ),
+        migrations.RunPython(record_move_deltas, migrations.RunPython.noop),
+    ]
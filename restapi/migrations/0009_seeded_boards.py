@@ -0,0 +1,36 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0008_move_delta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='tiles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), blank=True, help_text='Initial board. Only stored for games created before boards were generated from `seed`.', null=True, size=None),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='current_tiles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), blank=True, help_text='Board state after the latest move has been applied. Null until the first move.', null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='generator_version',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Version of the board generator used with `seed`.', null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='seed',
+            field=models.BigIntegerField(blank=True, help_text='Seed from which the initial board is generated.', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='game',
+            constraint=models.CheckConstraint(check=models.Q(('tiles__isnull', False), models.Q(('generator_version__isnull', False), ('seed__isnull', False)), _connector='OR'), name='game_has_initial_board'),
+        ),
+    ]
@@ -0,0 +1,133 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models, transaction
+
+import restapi.fields
+
+BATCH_SIZE = 500
+
+
+def convert_boards(model_name, fields, to_packed):
+    """Build a RunPython function copying boards between the
+    array columns in `fields` and their packed counterparts,
+    `BATCH_SIZE` rows per transaction.
+    """
+    def convert(apps, schema_editor):
+        Model = apps.get_model('restapi', model_name)
+        last_pk = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Model.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+                if not batch:
+                    return
+
+                for obj in batch:
+                    for field in fields:
+                        if to_packed:
+                            value = getattr(obj, field)
+                            if value is not None:
+                                value = restapi.fields.PackedBoard.from_tiles(value)
+                            setattr(obj, field + '_packed', value)
+                        else:
+                            value = getattr(obj, field + '_packed')
+                            setattr(obj, field, None if value is None else value.tiles)
+
+                updated = [f + '_packed' for f in fields] if to_packed else fields
+                Model.objects.bulk_update(batch, updated)
+                last_pk = batch[-1].pk
+
+    return convert
+
+
+class Migration(migrations.Migration):
+
+    # each batch of rows is converted in its own transaction
+    atomic = False
+
+    dependencies = [
+        ('restapi', '0009_seeded_boards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='tiles_packed',
+            field=restapi.fields.PackedBoardField(null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='current_tiles_packed',
+            field=restapi.fields.PackedBoardField(null=True),
+        ),
+        migrations.AddField(
+            model_name='checkpoint',
+            name='tiles_packed',
+            field=restapi.fields.PackedBoardField(null=True),
+        ),
+        migrations.RemoveConstraint(
+            model_name='game',
+            name='game_has_initial_board',
+        ),
+        # the array column must be nullable when it gets re-created by
+        # the reverse migration, before the boards are copied back into it
+        migrations.AlterField(
+            model_name='checkpoint',
+            name='tiles',
+            field=django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), size=None), null=True, size=None),
+        ),
+        migrations.RunPython(
+            convert_boards('Game', ['tiles', 'current_tiles'], to_packed=True),
+            convert_boards('Game', ['tiles', 'current_tiles'], to_packed=False),
+        ),
+        migrations.RunPython(
+            convert_boards('Checkpoint', ['tiles'], to_packed=True),
+            convert_boards('Checkpoint', ['tiles'], to_packed=False),
+        ),
+        migrations.RemoveField(
+            model_name='game',
+            name='tiles',
+        ),
+        migrations.RemoveField(
+            model_name='game',
+            name='current_tiles',
+        ),
+        migrations.RemoveField(
+            model_name='checkpoint',
+            name='tiles',
+        ),
+        migrations.RenameField(
+            model_name='game',
+            old_name='tiles_packed',
+            new_name='tiles',
+        ),
+        migrations.RenameField(
+            model_name='game',
+            old_name='current_tiles_packed',
+            new_name='current_tiles',
+        ),
+        migrations.RenameField(
+            model_name='checkpoint',
+            old_name='tiles_packed',
+            new_name='tiles',
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='tiles',
+            field=restapi.fields.PackedBoardField(blank=True, help_text='Initial board. Only stored for games created before boards were generated from `seed`.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='current_tiles',
+            field=restapi.fields.PackedBoardField(blank=True, help_text='Board state after the latest move has been applied. Null until the first move.', null=True),
+        ),
+        migrations.AlterField(
+            model_name='checkpoint',
+            name='tiles',
+            field=restapi.fields.PackedBoardField(),
+        ),
+        migrations.AddConstraint(
+            model_name='game',
+            constraint=models.CheckConstraint(check=models.Q(('tiles__isnull', False), models.Q(('generator_version__isnull', False), ('seed__isnull', False)), _connector='OR'), name='game_has_initial_board'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0010_packed_boards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every change to the game state. Used to detect concurrent modifications.'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0011_game_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='game_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='move',
+            index=models.Index(fields=['owner', 'game_id', 'order'], name='move_owner_game_order_idx'),
+        ),
+    ]
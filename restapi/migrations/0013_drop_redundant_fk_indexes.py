@@ -0,0 +1,58 @@
+# Generated by Django 3.2.4 on 2026-10-18 05:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# (index name, table, column) of the foreign key indexes that are
+# prefixes of a composite index or unique constraint
+REDUNDANT_INDEXES = [
+    ('restapi_checkpoint_game_id_id_67396e26', 'restapi_checkpoint', 'game_id_id'),
+    ('restapi_game_owner_id_bbef0a94', 'restapi_game', 'owner_id'),
+    ('restapi_move_game_id_id_a4fb517c', 'restapi_move', 'game_id_id'),
+    ('restapi_move_owner_id_4f315698', 'restapi_move', 'owner_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('restapi', '0012_list_indexes'),
+    ]
+
+    # only drop the indexes: altering the fields would also
+    # drop and re-validate the foreign key constraints
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    f'DROP INDEX IF EXISTS "{name}"',
+                    reverse_sql=f'CREATE INDEX "{name}" ON "{table}" ("{column}")',
+                )
+                for name, table, column in REDUNDANT_INDEXES
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='checkpoint',
+                    name='game_id',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='restapi.game'),
+                ),
+                migrations.AlterField(
+                    model_name='game',
+                    name='owner',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='move',
+                    name='game_id',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='restapi.game'),
+                ),
+                migrations.AlterField(
+                    model_name='move',
+                    name='owner',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
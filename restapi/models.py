@@ -1,21 +1,49 @@
 import logging
+from typing import List, Tuple
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.postgres.fields import ArrayField
 from django.conf import settings
 from django.utils.timezone import now
 
 from restapi import const
-from restapi.sweepergame import SweeperGame
+from restapi.cache import game_cache, shared_game_cache
+from restapi.fields import PackedBoard, PackedBoardField
+from restapi.sweepergame import SweeperGame, GameStatus, Tile, \
+    GENERATOR_VERSION, new_seed
 
 logger = logging.getLogger('sweeper')
 
 class Game(models.Model):
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # game list pages
+            models.Index(fields=['owner', 'created_at', 'id'], name='game_owner_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                name='game_has_initial_board',
+                check=models.Q(tiles__isnull=False)
+                    | models.Q(seed__isnull=False, generator_version__isnull=False),
+            ),
+        ]
 
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    STATUS_CHOICES = [
+        (GameStatus.IN_PROGRESS.value, 'In progress'),
+        (GameStatus.USER_WON.value, 'User won'),
+        (GameStatus.USER_LOST.value, 'User lost'),
+    ]
+
+    # fields changed by moves and rewinds
+    STATE_FIELDS = ['current_tiles', 'status', 'move_count', 'start_time', 'end_time']
+
+    # fields that can be deferred when the game state may be cached
+    BOARD_FIELDS = ['tiles', 'current_tiles']
+
+    # indexed by game_owner_created_idx
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     num_rows = models.IntegerField(
         validators=[MinValueValidator(const.MIN_ROWS), MaxValueValidator(const.MAX_ROWS)],
     )
@@ -39,28 +67,168 @@ class Game(models.Model):
         blank=True,
         help_text='Time at which the game was completed.'
     )
-    tiles = ArrayField(
-        ArrayField(models.IntegerField())
+    tiles = PackedBoardField(
+        null=True,
+        blank=True,
+        help_text='Initial board. Only stored for games created '
+                  'before boards were generated from `seed`.'
+    )
+    generator_version = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text='Version of the board generator used with `seed`.'
+    )
+    seed = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text='Seed from which the initial board is generated.'
+    )
+    current_tiles = PackedBoardField(
+        null=True,
+        blank=True,
+        help_text='Board state after the latest move has been applied. '
+                  'Null until the first move.'
+    )
+    status = models.IntegerField(
+        choices=STATUS_CHOICES,
+        default=GameStatus.IN_PROGRESS.value,
+        help_text='Game status after the latest move has been applied.'
+    )
+    move_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of moves applied to the game so far.'
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text='Incremented on every change to the game state. '
+                  'Used to detect concurrent modifications.'
     )
 
     def __str__(self):
         return f'[Game (r={self.num_rows},c={self.num_cols},m={self.num_mines})'
 
     def save(self, *args, **kwargs):
-        if not self.id:
-            game = SweeperGame(
-                self.num_rows,
-                self.num_cols,
-                self.num_mines,
-            )
-            self.tiles = game.tiles
+        if not self.id and self.tiles is None and self.seed is None:
+            self.generator_version, self.seed = GENERATOR_VERSION, new_seed()
         super(Game, self).save(*args, **kwargs)
 
+    def save_versioned(self, update_fields: List[str]) -> bool:
+        """Save `update_fields` only if nobody else has changed the
+        game since it was loaded, and increment its version.
+        No row lock is held while the new state is computed:
+        a concurrent change makes this save fail instead.
+
+        Args:
+            update_fields - Names of the fields to save.
+
+        Returns:
+            True if the game was saved, False if its version
+            in the database no longer matches `self.version`.
+        """
+        updated = Game.objects.filter(pk=self.pk, version=self.version).update(
+            version=models.F('version') + 1,
+            **{field: getattr(self, field) for field in update_fields},
+        )
+
+        if updated:
+            self.version += 1
+        return bool(updated)
+
+    @property
+    def initial_board(self) -> PackedBoard:
+        """Initial board, before any moves were made."""
+        if self.tiles is not None:
+            return self.tiles
+        return PackedBoard.from_game(self.get_initial_game())
+
+    def get_initial_game(self) -> SweeperGame:
+        """Build a SweeperGame from the initial board.
+        Seeded boards come from an in-process cache after
+        the first time they are generated.
+        """
+        if self.tiles is not None:
+            return self.tiles.to_game()
+
+        return SweeperGame.from_seed(
+            self.num_rows,
+            self.num_cols,
+            self.num_mines,
+            self.seed,
+            self.generator_version,
+        )
+
+    def get_current_game(self) -> SweeperGame:
+        """Build a SweeperGame from the latest board state,
+        without replaying the move history.
+
+        The state is taken from the process' game cache, or else
+        from the cache shared by all processes, if either has this
+        game at this version. The board fields then do not need
+        to be loaded (see `BOARD_FIELDS`).
+        """
+        game = game_cache.get(self.id, self.version)
+        if game is not None:
+            return game
+
+        game = shared_game_cache.get(self.id, self.version)
+        if game is not None:
+            return game
+
+        if self.current_tiles is None:
+            return self.get_initial_game()
+        return self.current_tiles.to_game()
+
+    def cache_game(self, game: SweeperGame):
+        """Write `game` to the game caches as the state at the
+        current version, once the current transaction commits.
+        The game must not be modified afterwards.
+        """
+        game_id, version = self.id, self.version
+
+        def write_through():
+            game_cache.put(game_id, version, game)
+            shared_game_cache.put(game_id, version, game)
+
+        transaction.on_commit(write_through)
+
+    def record_move(self, game: SweeperGame, count: int=1) -> int:
+        """Store `game` as the latest state of this game.
+
+        The caller is responsible for saving the model
+        (see `save_versioned`) in the same transaction
+        as the new Moves.
+
+        Args:
+            game - State of the game after applying the new moves.
+            count - Number of new moves.
+
+        Returns:
+            The order allocated to the first new move.
+            The others follow it consecutively.
+        """
+        order = self.move_count
+        self.current_tiles = PackedBoard.from_game(game)
+        self.status = game.status.value
+        self.move_count += count
+
+        if self.start_time is None:
+            self.start_time = now()
+
+        if self.end_time is None and game.status != GameStatus.IN_PROGRESS:
+            logger.debug('Game is over. Updating end_time on model.')
+            self.end_time = now()
+
+        return order
+
 
 class Move(models.Model):
     class Meta:
         unique_together = ('game_id', 'order')
         ordering = ['game_id', 'order']
+        indexes = [
+            # move list pages
+            models.Index(fields=['owner', 'game_id', 'order'], name='move_owner_game_order_idx'),
+        ]
 
     REVEAL = 'R'
     FLAG = 'F'
@@ -69,10 +237,18 @@ class Move(models.Model):
         (FLAG, 'Flag'),
     ]
 
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # tile bit toggled by each kind of move
+    DELTA_MASKS = {
+        REVEAL: Tile.VISIBLE,
+        FLAG: Tile.FLAG,
+    }
+
+    # indexed by move_owner_game_order_idx and the unique constraint
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     game_id = models.ForeignKey(
         Game,
         on_delete=models.CASCADE,
+        db_index=False,
     )
     order = models.PositiveIntegerField(
         help_text='Sequence ordering for a specific game'
@@ -89,25 +265,55 @@ class Move(models.Model):
         default=REVEAL,
         help_text='Action being performed. "R" to reveal a tile, "F" to flag it.'
     )
+    delta = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        help_text='Indices (row * num_cols + col) of the tiles changed by this move.'
+    )
 
     def __str__(self):
         return f'[Move (id={self.id},game_id={self.game_id},order={self.order})]'
 
     def save(self, *args, **kwargs):
-        if not self.id:
-            # auto-increment the order field separately for each game_id
-            logger.debug('Creating new move')
-
-            agg = Move.objects.filter(
-                game_id=self.game_id
-                ).aggregate(models.Max('order'))
-
-            if agg['order__max'] is not None:
-                self.order = agg['order__max'] + 1
-            else:
-                # this is the first move in the game
-                self.order = 0
-                self.game_id.start_time = now()
-                self.game_id.save()
-
+        if self.order is None:
+            # the move must also be applied to the game's materialized
+            # state, which allocates its order (see `Game.record_move`)
+            raise ValueError('Move.order must be allocated by Game.record_move.')
         super(Move, self).save(*args, **kwargs)
+
+    def get_delta(self) -> Tuple[List[int], int]:
+        """Returns the (indices, mask) delta for SweeperGame.apply_deltas."""
+        return self.delta, Move.DELTA_MASKS[self.action]
+
+
+class Checkpoint(models.Model):
+    """Snapshot of a game's board taken every
+    `settings.SWEEPER_CHECKPOINT_INTERVAL` moves, so that the state
+    after any move can be rebuilt from the nearest earlier checkpoint
+    instead of from the initial board.
+    """
+    class Meta:
+        unique_together = ('game_id', 'order')
+        ordering = ['game_id', 'order']
+
+    # indexed by the unique constraint
+    game_id = models.ForeignKey(
+        Game,
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    order = models.PositiveIntegerField(
+        help_text='Order of the move after which the snapshot was taken'
+    )
+    tiles = PackedBoardField()
+
+    def __str__(self):
+        return f'[Checkpoint (game_id={self.game_id_id},order={self.order})]'
+
+    @staticmethod
+    def is_due(order: int) -> bool:
+        """Check whether a checkpoint should be taken
+        after the move with the specified order."""
+        return (order + 1) % settings.SWEEPER_CHECKPOINT_INTERVAL == 0
+
@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+def keyset_filter(fields: Sequence[str], values: Sequence, descending: bool) -> Q:
+    """Build the condition selecting the rows that come after
+    `values` when sorting by `fields`, all in the same direction.
+
+    The leading field also gets a plain range condition,
+    so that the database can start the index scan at `values`
+    rather than filter out every row before them.
+    """
+    lt = 'lt' if descending else 'gt'
+    lte = 'lte' if descending else 'gte'
+
+    condition = Q(**{f'{fields[-1]}__{lt}': values[-1]})
+    for field, value in zip(reversed(fields[:-1]), reversed(values[:-1])):
+        condition = Q(**{f'{field}__{lt}': value}) | (Q(**{field: value}) & condition)
+
+    return Q(**{f'{fields[0]}__{lte}': values[0]}) & condition
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a unique, composite sort key.
+
+    Each page is selected with a range condition on the key
+    instead of an OFFSET, and the total number of rows is never
+    counted, so with an index on the key every page is as cheap
+    to fetch as the first one.
+
+    Views list the sort keys they support in `cursor_orderings`,
+    keyed by the value of the `ordering` query parameter that
+    selects them. The first one is the default. Every field of
+    a key is sorted in the same direction.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None) -> List:
+        self.request = request
+        self.ordering = self.get_ordering(request, view)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+        position, self.reverse = self.decode_cursor(request)
+        descending = self.ordering[0].startswith('-') != self.reverse
+
+        queryset = queryset.order_by(*(
+            ('-' if descending else '') + field for field in self.fields))
+        if position is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(self.fields, position, descending))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, request, view) -> Tuple[str, ...]:
+        orderings = getattr(view, 'cursor_orderings', None)
+        assert orderings, (
+            f'{view.__class__.__name__} must define `cursor_orderings` '
+            f'to use {self.__class__.__name__}.'
+        )
+
+        ordering = request.query_params.get(self.ordering_query_param)
+        if ordering is None:
+            return next(iter(orderings.values()))
+
+        if ordering not in orderings:
+            raise ValidationError(
+                f'Unsupported ordering. Use one of: {", ".join(orderings)}.')
+        return orderings[ordering]
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def decode_cursor(self, request) -> Tuple[Optional[List], bool]:
+        """
+        Returns:
+            The sort key values of the row that the page starts
+            after (or None for the first page), and whether the
+            page is the one before that row instead.
+
+        Raises:
+            NotFound - if the cursor is malformed.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (binascii.Error, KeyError, TypeError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        position = []
+        for field in self.fields:
+            value = getattr(row, field)
+            # isoformat keeps the microseconds, so that
+            # rows created in the same millisecond are not skipped
+            position.append(value.isoformat() if isinstance(value, datetime) else value)
+
+        cursor = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, encoded)
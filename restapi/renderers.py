@@ -0,0 +1,128 @@
+import base64
+import datetime
+
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from restapi.fields import PackedBoard
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class BoardJSONEncoder(JSONEncoder):
+    """Outputs boards as lists of rows of tile values."""
+
+    def default(self, obj):
+        if isinstance(obj, PackedBoard):
+            return obj.tiles
+        return super().default(obj)
+
+
+class PackedBoardJSONEncoder(JSONEncoder):
+    """Outputs boards as the base64 encoded bytes stored
+    by PackedBoardField: the shape header and one byte per tile."""
+
+    def default(self, obj):
+        if isinstance(obj, PackedBoard):
+            return base64.b64encode(obj.raw).decode('ascii')
+        return super().default(obj)
+
+
+class RLEBoardJSONEncoder(JSONEncoder):
+    """Outputs boards as run-length encoded strings
+    (see `PackedBoard.to_rle`)."""
+
+    def default(self, obj):
+        if isinstance(obj, PackedBoard):
+            return obj.to_rle()
+        return super().default(obj)
+
+
+class BoardJSONRenderer(JSONRenderer):
+    """The default renderer. Serializers output boards as PackedBoard
+    objects, which are only decoded into nested lists here,
+    rather than tile by tile by serializer fields.
+
+    Compact output is encoded with the optional `orjson` package
+    when it is installed, producing the same bytes as JSONRenderer
+    for the types used in API responses (which contain no floats).
+    """
+    encoder_class = BoardJSONEncoder
+    # converts the values that orjson does not handle the same way
+    default_encoder = BoardJSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default_encoder.default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # e.g. dicts with non-string keys
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes these for compatibility with JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class PackedBoardJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.sweeper.packed+json'
+    format = 'packed'
+    encoder_class = PackedBoardJSONEncoder
+
+
+class RLEBoardJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.sweeper.rle+json'
+    format = 'rle'
+    encoder_class = RLEBoardJSONEncoder
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders MessagePack, with boards as binary values holding
+    the bytes stored by PackedBoardField.
+    Requires the optional `msgpack` package.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    @staticmethod
+    def encode(obj):
+        if isinstance(obj, PackedBoard):
+            return obj.raw
+        if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+            return obj.isoformat()
+        raise TypeError('Cannot serialize %r' % obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encode)
+
+
+# renderers for views that output boards, in order of preference
+BOARD_RENDERER_CLASSES = [
+    BoardJSONRenderer,
+    BrowsableAPIRenderer,
+    PackedBoardJSONRenderer,
+    RLEBoardJSONRenderer,
+]
+
+if msgpack is not None:
+    BOARD_RENDERER_CLASSES.append(MessagePackRenderer)
@@ -1,11 +1,39 @@
+from typing import List
+
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
 
-from django.utils.timezone import now
+from restapi import const
+from restapi.fields import PackedBoard
+from restapi.models import Game, Move, Checkpoint
+
+def tile_changes(board, indices: List[int]) -> List[List[int]]:
+    """[index, value] pairs of the tiles at `indices` in a flat board."""
+    return [[index, board[index]] for index in indices]
+
+
+# formats dates for the hand-built responses,
+# the same way as the model serializers' fields
+_datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    return None if value is None else _datetime_field.to_representation(value)
+
+
+class BoardField(serializers.Field):
+    """Read-only field for PackedBoard values. Boards are passed
+    through to the renderer, which encodes them in one go in the
+    format requested by the client (see restapi.renderers),
+    rather than tile by tile through nested IntegerFields.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value
 
-from restapi.exceptions import InvalidMoveException, GameOverException
-from restapi.models import Game, Move
-from restapi.sweepergame import SweeperGame, GameStatus
 
 class GameSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,10 +48,7 @@ class GameSerializer(serializers.ModelSerializer):
 
 
 class GameDetailSerializer(serializers.ModelSerializer):
-    tiles = serializers.ListField(child=serializers.ListField(
-        child=serializers.IntegerField(),
-        read_only=True
-    ), read_only=True)
+    tiles = BoardField(source='initial_board')
 
     class Meta:
         model = Game
@@ -35,6 +60,7 @@ class GameDetailSerializer(serializers.ModelSerializer):
             'created_at',
             'start_time',
             'end_time',
+            'version',
             'tiles',
         ]
 
@@ -42,31 +68,32 @@ class CurrentStateMixin(serializers.ModelSerializer):
     state = serializers.SerializerMethodField()
 
     def get_state(self, obj):
-        """Replay the history of moves and build the
-        state of the game after applying the current move.
+        """Rebuild the state of the game after applying the current
+        move, starting from the nearest earlier checkpoint and
+        applying the recorded deltas of the moves made since then.
         """
 
+        checkpoint = Checkpoint.objects.filter(
+            game_id=obj.game_id_id, order__lte=obj.order).order_by('-order').first()
+
+        if checkpoint is not None:
+            game = checkpoint.tiles.to_game()
+            replay_from = checkpoint.order + 1
+        else:
+            game = obj.game_id.get_initial_game()
+            replay_from = 0
+
         move_history = Move.objects.filter(
-            game_id=obj.game_id, order__lte=obj.order).order_by('order')
-
-        game = SweeperGame.from_tile_arr(obj.game_id.tiles)
-
-        try:
-            for move in move_history:
-                if move.action == 'R':
-                    game = game.reveal_tile(move.row, move.col)
-                elif move.action == 'F':
-                    game = game.set_flag(move.row, move.col)
-                else:
-                    raise Exception('Invalid action')
-        except InvalidMoveException:
-            raise ValidationError('Invalid move')
-        except GameOverException:
-            raise ValidationError('Cannot apply move to completed game')
+            game_id=obj.game_id_id,
+            order__gte=replay_from,
+            order__lte=obj.order
+        ).order_by('order').only('action', 'delta')
+
+        game.apply_deltas(move.get_delta() for move in move_history)
 
         return {
             'status': game.status.value,
-            'tiles': game.tiles
+            'tiles': PackedBoard.from_game(game)
         }
 
 
@@ -99,6 +126,17 @@ class MoveDetailSerializer(CurrentStateMixin):
 
 
 class MoveCreateSerializer(CurrentStateMixin):
+    version = serializers.IntegerField(source='game_id.version', read_only=True)
+
+    def get_state(self, obj):
+        """A newly created move is always the latest one in its game,
+        so the materialized game state can be returned as-is.
+        """
+        return {
+            'status': obj.game_id.status,
+            'tiles': obj.game_id.current_tiles
+        }
+
     class Meta:
         model = Move
         fields = [
@@ -106,6 +144,83 @@ class MoveCreateSerializer(CurrentStateMixin):
             'row',
             'col',
             'action',
+            'version',
             'state',
         ]
+        # the view looks the game up itself
+        read_only_fields = ('game_id',)
+
+
+class MoveCreateChangesSerializer(MoveCreateSerializer):
+    """Returns only the tiles changed by the new move,
+    rather than the whole board."""
+    changes = serializers.SerializerMethodField()
+
+    def get_changes(self, obj):
+        return tile_changes(obj.game_id.current_tiles.board, obj.delta)
+
+    def get_state(self, obj):
+        return {
+            'status': obj.game_id.status,
+        }
 
+    class Meta(MoveCreateSerializer.Meta):
+        fields = MoveCreateSerializer.Meta.fields + ['changes']
+
+
+
+class BatchMoveSerializer(serializers.Serializer):
+    row = serializers.IntegerField(min_value=0, max_value=const.MAX_ROWS-1)
+    col = serializers.IntegerField(min_value=0, max_value=const.MAX_COLS-1)
+    action = serializers.ChoiceField(choices=Move.ACTION_CHOICES)
+
+
+class MoveBatchSerializer(serializers.Serializer):
+    """Input of the batch move endpoint."""
+    game_id = serializers.IntegerField()
+    version = serializers.IntegerField(required=False)
+    moves = BatchMoveSerializer(many=True, allow_empty=False)
+
+    def validate_moves(self, moves):
+        if len(moves) > const.MAX_BATCH_MOVES:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than {const.MAX_BATCH_MOVES} elements.')
+        return moves
+
+
+def game_detail_data(game: Game) -> dict:
+    """Hand-built equivalent of `GameDetailSerializer(game).data`,
+    without the serializer's per-field overhead. Both must output
+    the same keys in the same order."""
+    return {
+        'id': game.id,
+        'num_rows': game.num_rows,
+        'num_cols': game.num_cols,
+        'num_mines': game.num_mines,
+        'created_at': format_datetime(game.created_at),
+        'start_time': format_datetime(game.start_time),
+        'end_time': format_datetime(game.end_time),
+        'version': game.version,
+        'tiles': game.initial_board,
+    }
+
+
+def move_create_data(move: Move, changes: bool=False) -> dict:
+    """Hand-built equivalent of the `data` of MoveCreateSerializer,
+    or MoveCreateChangesSerializer if `changes` is set, for a move
+    that has just been made."""
+    game = move.game_id
+    data = {
+        'game_id': game.id,
+        'row': move.row,
+        'col': move.col,
+        'action': move.action,
+        'version': game.version,
+    }
+
+    if changes:
+        data['state'] = {'status': game.status}
+        data['changes'] = tile_changes(game.current_tiles.board, move.delta)
+    else:
+        data['state'] = {'status': game.status, 'tiles': game.current_tiles}
+    return data
@@ -1,7 +1,10 @@
 from enum import Enum
 import random
-from copy import deepcopy
-from typing import List, Tuple
+import secrets
+from collections import deque, namedtuple
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Iterable, List, Optional, Tuple
 
 from restapi import const
 from restapi.exceptions import InvalidMoveException, GameOverException
@@ -24,6 +27,10 @@ class Tile():
     0 0 0 0 0 0
     """
 
+    MINE = 1
+    VISIBLE = 2
+    FLAG = 4
+
     @staticmethod
     def is_mine(t):
         return t%2 == 1
@@ -61,14 +68,146 @@ class Tile():
         return t >> 3
 
 
+NeighborTable = namedtuple('NeighborTable', ['classes', 'offsets'])
+NeighborTable.__doc__ = """Neighbors of every tile of a board, as flat indices.
+
+The neighbors of tile `i` are `i + d` for each `d` in
+`offsets[classes[i]]`. Tiles are classified by which of their borders
+touch the edge of the board, so there are only 16 distinct offset
+tuples, and `classes` costs one byte per tile.
+"""
+
+
+@lru_cache(maxsize=const.NEIGHBOR_TABLE_CACHE_SIZE)
+def neighbor_table(num_rows: int, num_cols: int) -> NeighborTable:
+    """Build the NeighborTable for a board shape. Tables are cached,
+    so each shape is only computed once per process.
+    """
+    up, down, left, right = 1, 2, 4, 8
+
+    offsets = []
+    for cls in range(16):
+        offsets.append(tuple(
+            dr * num_cols + dc
+            for dr in (-1, 0, 1)
+            for dc in (-1, 0, 1)
+            if (dr, dc) != (0, 0)
+            and (dr != -1 or cls & up) and (dr != 1 or cls & down)
+            and (dc != -1 or cls & left) and (dc != 1 or cls & right)
+        ))
+
+    def row_classes(row_cls):
+        return bytes(
+            row_cls | (left if c > 0 else 0) | (right if c < num_cols-1 else 0)
+            for c in range(num_cols))
+
+    if num_rows == 1:
+        classes = row_classes(0)
+    else:
+        classes = row_classes(down) \
+            + row_classes(up | down) * (num_rows - 2) \
+            + row_classes(up)
+
+    return NeighborTable(classes, tuple(offsets))
+
+
+def sample_indices(n: int, k: int, rand: Callable[[], float]) -> List[int]:
+    """Pick `k` distinct integers from range(n).
+
+    This is a partial Fisher-Yates shuffle that only keeps track
+    of the swapped positions, so it costs O(k). Unlike random.sample,
+    it only relies on `random()`, whose output for a given seed
+    Python guarantees not to change between versions.
+    """
+    swapped = {}
+    picked = []
+    for i in range(k):
+        j = i + int(rand() * (n - i))
+        picked.append(swapped.get(j, j))
+        swapped[j] = swapped.get(i, i)
+    return picked
+
+
+# Version of the board generator used for seeded boards.
+# Bump it (keeping the previous generator available in
+# `seeded_board`) whenever a seed would produce a different board.
+GENERATOR_VERSION = 1
+
+
+def new_seed() -> int:
+    """Random seed for a new board. Seeds come from the OS
+    entropy source, so boards can't be predicted from earlier ones."""
+    return secrets.randbits(63)
+
+
+@lru_cache(maxsize=const.SEEDED_BOARD_CACHE_SIZE)
+def seeded_board(num_rows: int, num_cols: int, num_mines: int,
+                 seed: int, version: int=GENERATOR_VERSION) -> bytes:
+    """Deterministically generate a board from a seed.
+
+    Boards are cached, so loading the same game again
+    does not run the generator.
+
+    Returns:
+        Flat, row-major board, one byte per tile.
+
+    Raises:
+        ValueError if the generator version is not supported.
+    """
+    if version != 1:
+        raise ValueError('Unsupported board generator version %d' % version)
+
+    game = SweeperGame(num_rows, num_cols, num_mines, seed=seed)
+    return bytes(game.board)
+
+
+def neighbor_counts(mines: bytes, num_rows: int, num_cols: int) -> bytes:
+    """Count the mines surrounding every tile of a board.
+
+    This is a 3x3 box sum done as shifted sums, horizontal then
+    vertical, minus the center tile. The whole board is packed into
+    a single integer with one byte per tile, so each shifted sum is
+    one big-integer operation (no tile can reach 256, so bytes never
+    carry into each other).
+
+    Args:
+        mines - Flat, row-major board with 1 for mines and 0 elsewhere
+        num_rows - Number of rows
+        num_cols - Number of columns
+
+    Returns:
+        Flat, row-major neighbor counts, one byte per tile.
+    """
+    num_tiles = num_rows * num_cols
+    row_bits = num_cols * 8
+    full = (1 << (num_tiles * 8)) - 1
+    # zero out the first (last) column, where a horizontal
+    # shift would otherwise wrap around from the previous (next) row
+    not_first_col = int.from_bytes((b'\x00' + b'\xff' * (num_cols-1)) * num_rows, 'big')
+    not_last_col = int.from_bytes((b'\xff' * (num_cols-1) + b'\x00') * num_rows, 'big')
+
+    m = int.from_bytes(mines, 'big')
+    h = m + ((m >> 8) & not_first_col) + ((m << 8) & not_last_col)
+    v = h + (h >> row_bits) + ((h << row_bits) & full)
+
+    return (v - m).to_bytes(num_tiles, 'big')
+
+
 class SweeperGame():
     """Represents a game state.
+
+    The board is stored as a flat, row-major `bytearray`
+    with one byte per tile (see `Tile` for the bit layout),
+    so the tile at (r, c) is `board[r * num_cols + c]`.
+    The nested-list form exposed by `tiles` is only meant
+    for the DB and JSON boundaries.
     """
 
     def __init__(self, num_rows: int,
                        num_cols: int,
                        num_mines: int,
-                       set_mines: bool=True):
+                       set_mines: bool=True,
+                       seed: Optional[int]=None):
         """
         Args:
             num_rows - Number of rows
@@ -76,50 +215,130 @@ class SweeperGame():
             num_mines - Number of mines
             set_mines - If true, `num_mines` will be placed
                 on the grid in random locations.
-                Set this to False and modify the `tiles`
+                Set this to False and assign the `tiles`
                 property to create a grid manually
+            seed - If set, mines are placed deterministically:
+                the same seed always gives the same board
+                for a given GENERATOR_VERSION.
         """
         self.num_rows = num_rows
         self.num_cols = num_cols
         self.num_mines = num_mines
-        self.status = GameStatus.IN_PROGRESS
-        self.tiles = [[0]*num_cols for _ in range(num_rows)]
+        self.board = bytearray(num_rows * num_cols)
+
+        # Running counters kept up to date by every move,
+        # so that `status` never needs to scan the board.
+        self.hidden_safe = num_rows * num_cols
+        self.mines_revealed = 0
+
+        # Flat indices (row * num_cols + col) of the tiles
+        # changed by the move that produced this game state.
+        self.delta = []
 
         if set_mines:
-            self.set_mines()
+            rand = random.Random(seed).random if seed is not None else random.random
+            self.set_mines(rand)
+            self.hidden_safe -= num_mines
+
+    @property
+    def status(self) -> GameStatus:
+        """Current status of the game, read from the running counters.
+        See `check_status` for the equivalent full-board scan.
+        """
+        if self.mines_revealed:
+            return GameStatus.USER_LOST
+
+        if self.hidden_safe == 0:
+            return GameStatus.USER_WON
+
+        return GameStatus.IN_PROGRESS
+
+    @property
+    def tiles(self) -> List[List[int]]:
+        """The board as a list of rows of tile values."""
+        nc = self.num_cols
+        return [list(self.board[i:i+nc]) for i in range(0, len(self.board), nc)]
+
+    @tiles.setter
+    def tiles(self, tiles: List[List[int]]):
+        self.board = bytearray(chain.from_iterable(tiles))
+        self.count_tiles()
 
     @staticmethod
     def from_tile_arr(tiles: List[List[int]]):
         """Creates a SweeperGame instance from the provided
         game state.
         """
+        return SweeperGame.from_board(
+            len(tiles), len(tiles[0]), chain.from_iterable(tiles))
+
+    @staticmethod
+    def from_seed(num_rows: int, num_cols: int, num_mines: int,
+                  seed: int, version: Optional[int]=None):
+        """Creates a SweeperGame instance with the board
+        generated from `seed` (see `seeded_board`).
+        """
+        board = seeded_board(num_rows, num_cols, num_mines, seed,
+                             version or GENERATOR_VERSION)
+        return SweeperGame.from_board(num_rows, num_cols, board)
 
-        num_rows = len(tiles)
-        num_cols = len(tiles[0])
-        num_mines = 0
-        for row in tiles:
-            for tile in row:
-                if Tile.is_mine(tile):
-                    num_mines += 1
+    @staticmethod
+    def from_board(num_rows: int, num_cols: int, board):
+        """Creates a SweeperGame instance from a flat,
+        row-major board (any bytes-like object or iterable of ints).
+        """
+        board = bytearray(board)
+        num_mines = sum(t & Tile.MINE for t in board)
         gm = SweeperGame(num_rows, num_cols, num_mines, set_mines=False)
-        gm.tiles = deepcopy(tiles)
-        gm.status = gm.check_status()
+        gm.board = board
+        gm.count_tiles()
         return gm
 
-    def set_mines(self):
+    def snapshot(self):
+        """Returns an independent copy of this game state.
+
+        The `apply_*` methods modify the game in place, so callers
+        that need to keep the previous state around should take a
+        snapshot first. This is a single buffer copy.
+        """
+        gm = SweeperGame(self.num_rows, self.num_cols, self.num_mines, set_mines=False)
+        gm.board = bytearray(self.board)
+        gm.hidden_safe = self.hidden_safe
+        gm.mines_revealed = self.mines_revealed
+        return gm
+
+    def set_mines(self, rand: Callable[[], float]=random.random):
         """Place mines in random locations on the grid.
+
+        Mine positions are sampled without replacement in one go,
+        and the neighbor counts of every tile are then computed in
+        a single pass (see `neighbor_counts`), so generation cost
+        does not depend on the mine density.
+
+        This is the board generator for GENERATOR_VERSION 1.
+        Any change to the boards it produces for a given seed
+        must come with a new GENERATOR_VERSION.
+
+        Args:
+            rand - Source of random floats in [0, 1)
         """
-        remaining = self.num_mines
+        num_tiles = self.num_rows * self.num_cols
 
-        while remaining > 0:
-            r = random.randint(0, self.num_rows-1)
-            c = random.randint(0, self.num_cols-1)
+        if self.num_mines <= num_tiles // 2:
+            mines = bytearray(num_tiles)
+            for i in sample_indices(num_tiles, self.num_mines, rand):
+                mines[i] = Tile.MINE
+        else:
+            # dense boards: sample the safe tiles instead
+            mines = bytearray([Tile.MINE]) * num_tiles
+            for i in sample_indices(num_tiles, num_tiles - self.num_mines, rand):
+                mines[i] = 0
 
-            tile = self.tiles[r][c]
-            if not Tile.is_mine(tile):
-                self.tiles[r][c] = Tile.set_mine(tile)
-                self.increment_neighbors(r, c)
-                remaining -= 1
+        counts = neighbor_counts(mines, self.num_rows, self.num_cols)
+        board = int.from_bytes(self.board, 'big') \
+            | int.from_bytes(mines, 'big') \
+            | (int.from_bytes(counts, 'big') << 3)
+        self.board = bytearray(board.to_bytes(num_tiles, 'big'))
 
     def increment_neighbors(self, r: int, c: int):
         """Add 1 to the neighbor count of all 9 cells
@@ -129,25 +348,26 @@ class SweeperGame():
             r - Row of the center cell
             c - column of the center cell
         """
-        max_r = len(self.tiles) - 1
-        max_c = len(self.tiles[0]) - 1
-
-        for i in range(-1, 2):
-            for j in range(-1, 2):
+        i = r * self.num_cols + c
+        table = neighbor_table(self.num_rows, self.num_cols)
 
-                # don't increment neighbors for center tile
-                if i == 0 and j == 0:
-                    continue
+        for d in table.offsets[table.classes[i]]:
+            self.board[i+d] = Tile.add_neighbor(self.board[i+d])
 
-                # array bounds check
-                if r+i < 0 or r+i > max_r or c+j < 0 or c+j > max_c:
-                    continue
-
-                tile = self.tiles[r+i][c+j]
-                self.tiles[r+i][c+j] = Tile.add_neighbor(tile)
+    def count_tiles(self):
+        """Initialize the running counters behind `status`
+        by scanning the whole board. Only needed after the
+        board has been replaced wholesale.
+        """
+        board = self.board
+        # the two low bits are the mine and visibility bits
+        self.hidden_safe = sum(1 for t in board if not t & 3)
+        self.mines_revealed = sum(1 for t in board if t & 3 == 3)
 
     def check_status(self) -> GameStatus:
-        """Determine the status of the game
+        """Determine the status of the game by scanning the
+        whole board. The `status` property gives the same answer
+        in constant time.
 
         Returns:
             GameStatus.USER_LOST if the user has revealed a mine.
@@ -157,16 +377,15 @@ class SweeperGame():
 
         user_can_win = True
 
-        for row in self.tiles:
-            for tile in row:
-                if Tile.is_visible(tile) and Tile.is_mine(tile):
-                    return GameStatus.USER_LOST
+        for tile in self.board:
+            if Tile.is_visible(tile) and Tile.is_mine(tile):
+                return GameStatus.USER_LOST
 
-                if not Tile.is_mine(tile) and not Tile.is_visible(tile):
-                    # if there are any non-mine tiles
-                    # which are still uncovered, then the user
-                    # still has work to do (or they've lost)
-                    user_can_win = False
+            if not Tile.is_mine(tile) and not Tile.is_visible(tile):
+                # if there are any non-mine tiles
+                # which are still uncovered, then the user
+                # still has work to do (or they've lost)
+                user_can_win = False
 
         if user_can_win:
             return GameStatus.USER_WON
@@ -187,6 +406,21 @@ class SweeperGame():
 
         Returns:
             A new SweeperGame object with the modified tiles array.
+            Its `delta` lists the index of the modified tile.
+
+        Raises:
+            Same as `apply_flag`.
+        """
+        clone = self.snapshot()
+        clone.apply_flag(r, c)
+        return clone
+
+    def apply_flag(self, r: int, c: int) -> List[int]:
+        """Same as `set_flag`, but modifies this game in place.
+
+        Returns:
+            The flat index (row * num_cols + col) of the modified tile,
+            as a single-item list. It is also stored in `delta`.
 
         Raises:
             GameOverException if attempting to modify a finished game.
@@ -201,19 +435,19 @@ class SweeperGame():
         if not self.is_valid_tile_coords(r, c):
             raise InvalidMoveException('Invalid coordinates (%d, %d)' % (r,c))
 
-        tile = self.tiles[r][c]
+        i = r * self.num_cols + c
+        tile = self.board[i]
 
         if Tile.is_visible(tile):
             raise InvalidMoveException('Cannot set flag on visible tile')
 
-        clone = SweeperGame.from_tile_arr(self.tiles)
-
         if not Tile.is_flag(tile):
-            clone.tiles[r][c] = Tile.set_flag(tile)
+            self.board[i] = Tile.set_flag(tile)
         else:
-            clone.tiles[r][c] = Tile.unset_flag(tile)
+            self.board[i] = Tile.unset_flag(tile)
 
-        return clone
+        self.delta = [i]
+        return self.delta
 
     def reveal_tile(self, r: int, c: int):
         """User clicks on a tile, revealing its contents.
@@ -232,6 +466,21 @@ class SweeperGame():
 
         Returns:
             A new SweeperGame object containing the modified tile array.
+            Its `delta` lists the indices of all the revealed tiles.
+
+        Raises:
+            Same as `apply_reveal`.
+        """
+        clone = self.snapshot()
+        clone.apply_reveal(r, c)
+        return clone
+
+    def apply_reveal(self, r: int, c: int) -> List[int]:
+        """Same as `reveal_tile`, but modifies this game in place.
+
+        Returns:
+            The flat indices (row * num_cols + col) of all the
+            revealed tiles. They are also stored in `delta`.
 
         Raises:
             GameOverException if attempting to modify a finished game.
@@ -249,7 +498,7 @@ class SweeperGame():
         if not self.is_valid_tile_coords(r, c):
             raise InvalidMoveException('Invalid coordinates (%d, %d)' % (r,c))
 
-        tile = self.tiles[r][c]
+        tile = self.board[r * self.num_cols + c]
 
         if Tile.is_visible(tile):
             raise InvalidMoveException('Cannot reveal visible tile')
@@ -259,15 +508,15 @@ class SweeperGame():
         # There are basically two cases.
         # Either the user clicked on a mine, or they didnt.
         #
-        clone = SweeperGame.from_tile_arr(self.tiles)
 
         #
         # Case 1) User clicked on a mine
         #
         if Tile.is_mine(tile):
-            clone.tiles[r][c] = Tile.set_visible(tile)
-            clone.status = GameStatus.USER_LOST
-            return clone
+            self.board[r * self.num_cols + c] = Tile.set_visible(tile)
+            self.mines_revealed += 1
+            self.delta = [r * self.num_cols + c]
+            return self.delta
 
 
         #
@@ -276,25 +525,70 @@ class SweeperGame():
         # check all of its neighbors to see if any of them
         # can also be revealed.
         #
-        queue = [(r, c)]
+        # Tiles are marked visible as soon as they are queued,
+        # so each tile is visited at most once and the fill
+        # is linear in the number of revealed tiles.
+        #
+        board = self.board
+        classes, offsets = neighbor_table(self.num_rows, self.num_cols)
 
-        while queue:
-            current, queue = queue[0], queue[1:]
-            current_r, current_c = current
+        start = r * self.num_cols + c
+        board[start] = Tile.set_visible(tile)
+        delta = [start]
+        queue = deque(delta)
 
-            tile = clone.tiles[current_r][current_c]
+        while queue:
+            i = queue.popleft()
 
-            if Tile.is_visible(tile):
-                # this tile has already been processed
+            if Tile.count_neighbors(board[i]) != 0:
+                # only tiles without adjacent mines get expanded
                 continue
 
-            clone.tiles[current_r][current_c] = Tile.set_visible(tile)
+            for d in offsets[classes[i]]:
+                j = i + d
+                tile = board[j]
+                # neighbors of a tile without adjacent mines are
+                # never mines, so only visibility needs checking
+                if not tile & Tile.VISIBLE:
+                    board[j] = tile | Tile.VISIBLE
+                    delta.append(j)
+                    queue.append(j)
 
-            neighbors = clone.get_neighbors_to_reveal(current_r, current_c)
-            queue += neighbors
+        self.hidden_safe -= len(delta)
+        self.delta = delta
+        return delta
 
-        clone.status = clone.check_status()
-        return clone
+    def apply_deltas(self, deltas: Iterable[Tuple[List[int], int]]):
+        """Apply precomputed move deltas in place, without re-running
+        any of the move logic (flood fill, neighbor checks, ...).
+
+        Each delta is toggled into the board with XOR, so
+        applying the same deltas again in reverse order
+        rewinds the board to its previous state.
+
+        Args:
+            deltas - Iterable of (indices, mask) tuples, where `indices`
+                are the flat indices (row * num_cols + col) of the tiles
+                changed by a move, and `mask` is the tile bit it changed
+                (Tile.VISIBLE for reveals, Tile.FLAG for flags).
+        """
+        board = self.board
+
+        for indices, mask in deltas:
+            if mask != Tile.VISIBLE:
+                for i in indices:
+                    board[i] ^= mask
+                continue
+
+            for i in indices:
+                tile = board[i] ^ mask
+                board[i] = tile
+                # +1 if the tile was revealed, -1 if it was hidden again
+                step = 1 if tile & Tile.VISIBLE else -1
+                if tile & Tile.MINE:
+                    self.mines_revealed += step
+                else:
+                    self.hidden_safe -= step
 
     def get_neighbors_to_reveal(self, r: int, c: int) -> List[Tuple[int, int]]:
         """Returns a list of adjacent tiles that don't contain mines
@@ -303,28 +597,17 @@ class SweeperGame():
         Returns:
             List of tuple, where each tuple is (row_index, col_index).
         """
-        neighbors = []
+        i = r * self.num_cols + c
 
-        if Tile.count_neighbors(self.tiles[r][c]) != 0:
+        if Tile.count_neighbors(self.board[i]) != 0:
             # only tiles without adjacent mines get expanded
-            return neighbors
-
-        max_r = len(self.tiles) - 1
-        max_c = len(self.tiles[0]) - 1
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-
-                if i == 0 and j == 0:
-                    continue
-
-                # array bounds check
-                if r+i < 0 or r+i > max_r or c+j < 0 or c+j > max_c:
-                    continue
-
-                # don't re-expand visible tiles after we've already revealed them
-                if Tile.is_visible(self.tiles[r+i][c+j]):
-                    continue
+            return []
 
-                neighbors.append((r+i, c+j))
+        table = neighbor_table(self.num_rows, self.num_cols)
 
-        return neighbors
+        # don't re-expand visible tiles after we've already revealed them
+        return [
+            divmod(i+d, self.num_cols)
+            for d in table.offsets[table.classes[i]]
+            if not Tile.is_visible(self.board[i+d])
+        ]
@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from restapi.cache import shared_game_cache
+from restapi.models import Game, Move
+
+def with_shared_game_cache(test):
+    """Enable the shared game cache for a test method, with an
+    in-memory stand-in for the Redis cache used in production."""
+    test = mock.patch.object(shared_game_cache, 'alias', 'shared-games')(test)
+    return override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'shared-games': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })(test)
+
+
+class GameTestMixin():
+    """Creates a player, logs the test client in as them and
+    starts a game of the class' `num_rows`, `num_cols` and
+    `num_mines` for them."""
+
+    num_rows = 8
+    num_cols = 8
+    num_mines = 10
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('player')
+        self.client = self.login(self.user)
+        self.game = self.create_game()
+
+    def create_user(self, username: str) -> User:
+        return User.objects.create_user(username, password='password')
+
+    def login(self, user: User) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def create_game(self, owner: User = None) -> Game:
+        return Game.objects.create(
+            owner=owner or self.user,
+            num_rows=self.num_rows,
+            num_cols=self.num_cols,
+            num_mines=self.num_mines,
+        )
+
+    def post_move(self, row=0, col=0, action=Move.FLAG, url='/api/moves/', **data):
+        """POST a move in `self.game`, with any other fields in `data`."""
+        return self.client.post(url, dict({
+            'game_id': self.game.id,
+            'row': row,
+            'col': col,
+            'action': action,
+        }, **data), format='json')
+
+
+class GameTestCase(GameTestMixin, TestCase):
+    pass
+
+
+class GameTransactionTestCase(GameTestMixin, TransactionTestCase):
+    pass
@@ -0,0 +1,19 @@
+from django.test.runner import DiscoverRunner
+
+from restapi.cache import shared_game_cache
+
+class SweeperTestRunner(DiscoverRunner):
+    """Runs the tests with the shared game cache disabled, whatever
+    the environment configures, so that they never read or write the
+    cache of a development server. Tests that need it enable an
+    in-memory stand-in (see `base.with_shared_game_cache`).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.shared_game_cache_alias = shared_game_cache.alias
+        shared_game_cache.alias = None
+
+    def teardown_test_environment(self, **kwargs):
+        shared_game_cache.alias = self.shared_game_cache_alias
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from restapi.models import Move
+from restapi.tests.base import GameTestCase
+
+class ConditionalRequestTest(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post_move()
+        self.move = Move.objects.get(game_id=self.game)
+
+    def test_move_detail_is_immutable(self):
+        url = f'/api/moves/{self.move.id}/'
+        res = self.client.get(url)
+        self.assertEqual(200, res.status_code)
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('Accept', res['Vary'])
+
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(304, cached.status_code)
+        self.assertEqual(b'', cached.content)
+        self.assertEqual(res['ETag'], cached['ETag'])
+        self.assertEqual(1, len(context))
+
+        # the state is the same after later moves
+        self.post_move()
+        self.assertEqual(res.content, self.client.get(url).content)
+
+    def test_weak_comparison(self):
+        for url in [f'/api/moves/{self.move.id}/', f'/api/games/{self.game.id}/']:
+            etag = self.client.get(url)['ETag']
+            for header in ['W/' + etag, '"other", W/' + etag, '*']:
+                with self.subTest(url=url, header=header):
+                    res = self.client.get(url, HTTP_IF_NONE_MATCH=header)
+                    self.assertEqual(304, res.status_code)
+                    self.assertEqual(etag, res['ETag'])
+
+            res = self.client.get(url, HTTP_IF_NONE_MATCH='W/"other"')
+            self.assertEqual(200, res.status_code)
+
+    def test_move_etag_depends_on_format(self):
+        url = f'/api/moves/{self.move.id}/'
+        etag = self.client.get(url)['ETag']
+        res = self.client.get(url, HTTP_ACCEPT='application/vnd.sweeper.rle+json',
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, res.status_code)
+        self.assertNotEqual(etag, res['ETag'])
+
+    def test_move_etag_checks_owner(self):
+        url = f'/api/moves/{self.move.id}/'
+        etag = self.client.get(url)['ETag']
+
+        other = self.login(self.create_user('other'))
+        self.assertEqual(404, other.get(url, HTTP_IF_NONE_MATCH=etag).status_code)
+
+    def test_game_detail_revalidates(self):
+        url = f'/api/games/{self.game.id}/'
+        res = self.client.get(url)
+        self.assertEqual('no-cache', res['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(304, cached.status_code)
+        self.assertEqual(1, len(context))
+
+        self.post_move()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(200, changed.status_code)
+        self.assertNotEqual(res['ETag'], changed['ETag'])
+        self.assertEqual(2, changed.json()['version'])
+
+    def test_non_numeric_ids(self):
+        self.assertEqual(404, self.client.get('/api/moves/abc/').status_code)
+        self.assertEqual(404, self.client.get('/api/games/abc/').status_code)
@@ -0,0 +1,59 @@
+import unittest
+
+from restapi.fields import PackedBoard, PackedBoardField
+from restapi.sweepergame import SweeperGame
+
+class PackedBoardTest(unittest.TestCase):
+
+    tiles = [
+        [1, 8, 0, 0, 0, 0, 2],
+        [8, 8, 0, 0, 0, 0, 2],
+        [0, 0, 0, 0, 0, 0, 2],
+        [0, 0, 0, 0, 8, 8, 2],
+        [0, 0, 0, 0, 8, 1, 10],
+        [0, 0, 0, 0, 8, 8, 14],
+    ]
+
+    def test_round_trip(self):
+        board = PackedBoard.from_tiles(self.tiles)
+        self.assertEqual((6, 7), board.shape)
+        self.assertEqual(4 + 6 * 7, len(board.raw))
+        self.assertListEqual(self.tiles, board.tiles)
+
+        game = board.to_game()
+        self.assertListEqual(self.tiles, game.tiles)
+        self.assertEqual(2, game.num_mines)
+
+
+    def test_rle(self):
+        board = PackedBoard.from_tiles(self.tiles)
+        encoded = board.to_rle()
+        self.assertTrue(encoded.startswith('6x7:1,8,0*4,2,8*2,0*4,2,0*6,2,'))
+        self.assertEqual(board, PackedBoard.from_rle(encoded))
+
+        with self.assertRaises(ValueError):
+            PackedBoard.from_rle('6x7:0*41')
+
+    def test_from_game(self):
+        game = SweeperGame(20, 13, 40)
+        board = PackedBoard.from_game(game)
+        self.assertEqual((20, 13), board.shape)
+        self.assertEqual(bytes(game.board), board.board)
+        self.assertEqual(board, PackedBoard(bytes(board.raw)))
+
+    def test_to_game_copies_board(self):
+        board = PackedBoard.from_tiles(self.tiles)
+        game = board.to_game()
+        game.apply_reveal(2, 2)
+        self.assertListEqual(self.tiles, board.tiles)
+
+    def test_field_prep_value(self):
+        field = PackedBoardField()
+        board = PackedBoard.from_tiles(self.tiles)
+        self.assertEqual(board.raw, field.get_prep_value(board))
+        self.assertEqual(board.raw, field.get_prep_value(self.tiles))
+        self.assertIsNone(field.get_prep_value(None))
+
+        self.assertEqual(board, field.to_python(self.tiles))
+        self.assertEqual(board, field.to_python(board.raw))
+        self.assertEqual(board, field.from_db_value(memoryview(board.raw), None, None))
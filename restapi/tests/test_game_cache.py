@@ -0,0 +1,188 @@
+import unittest
+from unittest import mock
+
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, override_settings
+
+from restapi.cache import GameCache, SharedGameCache, game_cache, shared_game_cache
+from restapi.fields import PackedBoard
+from restapi.models import Game
+from restapi.sweepergame import SweeperGame, Tile
+from restapi.tests.base import GameTestCase, with_shared_game_cache
+
+class GameCacheTest(unittest.TestCase):
+
+    def make_game(self, num_rows=8, num_cols=8):
+        return SweeperGame(num_rows, num_cols, 10)
+
+    def test_hit_and_miss(self):
+        cache = GameCache(max_size=4, max_bytes=1 << 20)
+        game = self.make_game()
+        self.assertIsNone(cache.get(1, 0))
+
+        cache.put(1, 0, game)
+        cached = cache.get(1, 0)
+        self.assertEqual(game.tiles, cached.tiles)
+        self.assertIsNone(cache.get(1, 1))
+        self.assertEqual({'size': 1, 'size_bytes': 64 + GameCache.ENTRY_OVERHEAD,
+                          'hits': 1, 'misses': 2, 'evictions': 0}, cache.stats())
+
+    def test_returns_copies(self):
+        cache = GameCache(max_size=4, max_bytes=1 << 20)
+        cache.put(1, 0, self.make_game())
+
+        cache.get(1, 0).apply_flag(0, 0)
+        self.assertFalse(cache.get(1, 0).board[0] & Tile.FLAG)
+
+    def test_newer_version_replaces_game(self):
+        cache = GameCache(max_size=4, max_bytes=1 << 20)
+        cache.put(1, 3, self.make_game())
+        cache.put(1, 4, self.make_game())
+        self.assertEqual(1, len(cache))
+        self.assertIsNone(cache.get(1, 3))
+        self.assertIsNotNone(cache.get(1, 4))
+
+        # a late put of an older state is ignored
+        cache.put(1, 2, self.make_game())
+        self.assertIsNotNone(cache.get(1, 4))
+
+    def test_evicts_least_recently_used(self):
+        cache = GameCache(max_size=2, max_bytes=1 << 20)
+        for game_id in range(3):
+            cache.put(game_id, 0, self.make_game())
+            cache.get(0, 0)
+
+        self.assertIsNotNone(cache.get(0, 0))
+        self.assertIsNone(cache.get(1, 0))
+        self.assertIsNotNone(cache.get(2, 0))
+        self.assertEqual(1, cache.evictions)
+
+    def test_memory_limit(self):
+        entry_size = 400 + GameCache.ENTRY_OVERHEAD
+        cache = GameCache(max_size=10, max_bytes=2 * entry_size)
+        for game_id in range(3):
+            cache.put(game_id, 0, self.make_game(20, 20))
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2 * entry_size, cache.size_bytes)
+
+        # too large to cache at all
+        cache.put(3, 0, SweeperGame(100, 100, 10))
+        self.assertIsNone(cache.get(3, 0))
+        self.assertEqual(2, len(cache))
+
+
+@override_settings(CACHES={
+    'shared-test': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class SharedGameCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = SharedGameCache('shared-test', timeout=60)
+        self.cache.cache.clear()
+
+    def test_hit_and_miss(self):
+        game = SweeperGame(8, 8, 10)
+        game.apply_flag(2, 3)
+        self.assertIsNone(self.cache.get(1, 0))
+
+        self.cache.put(1, 0, game)
+        self.assertEqual(game.tiles, self.cache.get(1, 0).tiles)
+        self.assertIsNone(self.cache.get(1, 1))
+        self.assertIsNone(self.cache.get(2, 0))
+        self.assertEqual({'hits': 1, 'misses': 3}, self.cache.stats())
+
+    def test_stores_packed_board(self):
+        game = SweeperGame(16, 30, 99)
+        self.cache.put(1, 7, game)
+        value = self.cache.cache.get(self.cache.key(1))
+        self.assertEqual(SharedGameCache.HEADER.pack(7), value[:SharedGameCache.HEADER.size])
+        self.assertEqual(PackedBoard.from_game(game).raw, value[SharedGameCache.HEADER.size:])
+
+    def test_newer_version_replaces_game(self):
+        self.cache.put(1, 3, SweeperGame(8, 8, 10))
+        self.cache.put(1, 4, SweeperGame(8, 8, 10))
+        self.assertIsNone(self.cache.get(1, 3))
+        self.assertIsNotNone(self.cache.get(1, 4))
+
+    def test_keys_depend_on_database(self):
+        self.cache.put(1, 0, SweeperGame(8, 8, 10))
+        with mock.patch.dict(connection.settings_dict, NAME='other'):
+            self.assertIsNone(self.cache.get(1, 0))
+        self.assertIsNotNone(self.cache.get(1, 0))
+
+    def test_disabled_in_tests(self):
+        # whatever DJANGO_REDIS_URL says (see SweeperTestRunner)
+        self.assertIsNone(shared_game_cache.alias)
+
+    def test_disabled(self):
+        cache = SharedGameCache(None, timeout=60)
+        cache.put(1, 0, SweeperGame(8, 8, 10))
+        self.assertIsNone(cache.get(1, 0))
+        self.assertIsNone(self.cache.cache.get(self.cache.key(1)))
+        self.assertEqual({'hits': 0, 'misses': 0}, cache.stats())
+
+
+class GameCacheUsageTest(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        game_cache.clear()
+
+    def post_flag(self, row, col):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.post_move(row, col)
+        self.assertEqual(201, res.status_code)
+        return res.json()
+
+    def test_moves_use_cached_state(self):
+        self.post_flag(0, 0)
+        hits = game_cache.hits
+        res = self.post_flag(0, 1)
+        self.assertEqual(hits + 1, game_cache.hits)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.current_tiles.tiles, res['state']['tiles'])
+        self.assertTrue(res['state']['tiles'][0][0] & Tile.FLAG)
+
+    @with_shared_game_cache
+    def test_moves_use_shared_state(self):
+        self.post_flag(0, 0)
+        self.assertIsNotNone(shared_game_cache.get(self.game.id, 1))
+
+        # the next move is handled by another process
+        game_cache.clear()
+        hits = shared_game_cache.hits
+        res = self.post_flag(0, 1)
+        self.assertEqual(hits + 1, shared_game_cache.hits)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.current_tiles.tiles, res['state']['tiles'])
+        self.assertTrue(res['state']['tiles'][0][0] & Tile.FLAG)
+        self.assertTrue(res['state']['tiles'][0][1] & Tile.FLAG)
+
+    @with_shared_game_cache
+    def test_change_by_other_process(self):
+        self.post_flag(0, 0)
+
+        # another process removes the flag
+        game = self.game.get_initial_game()
+        Game.objects.filter(pk=self.game.pk).update(
+            current_tiles=PackedBoard.from_game(game), version=F('version') + 1)
+
+        misses = game_cache.misses
+        shared_misses = shared_game_cache.misses
+        res = self.post_flag(0, 1)
+        self.assertEqual(misses + 1, game_cache.misses)
+        self.assertEqual(shared_misses + 1, shared_game_cache.misses)
+        self.assertFalse(res['state']['tiles'][0][0] & Tile.FLAG)
+        self.assertTrue(res['state']['tiles'][0][1] & Tile.FLAG)
+
+    def test_rejected_move_keeps_cached_state(self):
+        self.post_flag(0, 0)
+        res = self.post_move(0, 0, version=0)
+        self.assertEqual(409, res.status_code)
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.current_tiles.tiles,
+                         game_cache.get(self.game.id, self.game.version).tiles)
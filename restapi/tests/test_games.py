@@ -0,0 +1,42 @@
+from restapi.fields import PackedBoard
+from restapi.models import Game
+from restapi.sweepergame import SweeperGame, Tile, GENERATOR_VERSION
+from restapi.tests.base import GameTestCase
+
+class GameCreateTest(GameTestCase):
+
+    def create(self, **data):
+        return self.client.post('/api/games/', dict({
+            'num_rows': 9, 'num_cols': 9, 'num_mines': 10,
+        }, **data), format='json')
+
+    def test_new_game_is_seeded(self):
+        res = self.create()
+        self.assertEqual(201, res.status_code)
+
+        game = Game.objects.get(pk=res.json()['id'])
+        self.assertEqual(GENERATOR_VERSION, game.generator_version)
+        self.assertIsNotNone(game.seed)
+        self.assertIsNone(game.tiles)
+        self.assertIsNone(game.current_tiles)
+
+        tiles = self.client.get(f'/api/games/{game.id}/').json()['tiles']
+        self.assertEqual(game.initial_board.tiles, tiles)
+        self.assertEqual(10, sum(tile & Tile.MINE for row in tiles for tile in row))
+
+    def test_new_games_get_different_boards(self):
+        games = [Game.objects.get(pk=self.create().json()['id']) for _ in range(3)]
+        self.assertEqual(3, len({game.seed for game in games}))
+        self.assertEqual(3, len({game.initial_board.raw for game in games}))
+
+    def test_explicit_board_is_kept(self):
+        board = PackedBoard.from_game(SweeperGame(8, 8, 10))
+        game = Game.objects.create(
+            owner=self.user, num_rows=8, num_cols=8, num_mines=10, tiles=board)
+        game.refresh_from_db()
+        self.assertIsNone(game.seed)
+        self.assertEqual(board, game.initial_board)
+
+    def test_too_many_mines(self):
+        self.assertEqual(400, self.create(num_mines=81).status_code)
+        self.assertEqual(1, Game.objects.count())
@@ -0,0 +1,89 @@
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from restapi.models import Move
+from restapi.pagination import KeysetPagination
+from restapi.tests.base import GameTestCase
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+@override_settings(SWEEPER_CHECKPOINT_INTERVAL=5)
+class IndexUsageTest(GameTestCase):
+    """Checks the query plans of the API's list and history
+    queries. Sequential and bitmap scans are disabled, so that
+    the planner walks an index whenever one matches, even on
+    tiny tables: a query that still needs a sequential scan
+    or a sort has no matching index.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for user in [self.create_user('other'), self.user]:
+            for _ in range(6):
+                self.create_game(user)
+
+        for _ in range(12):
+            self.post_move()
+        self.move = Move.objects.get(game_id=self.game, order=8)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+
+        # the psycopg2 version may not parse the JSON
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return list(plan_nodes(plan[0]['Plan']))
+
+    def assertIndexed(self, method, url, data=None, indexes=()):
+        with CaptureQueriesContext(connection) as context:
+            getattr(self.client, method)(url, data, format='json')
+
+        used = set()
+        for query in context.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+
+            for node in self.explain(query['sql']):
+                self.assertNotIn(node['Node Type'], ('Seq Scan', 'Sort'), query['sql'])
+                if 'Index Name' in node:
+                    used.add(node['Index Name'])
+
+        for index in indexes:
+            self.assertIn(index, used)
+
+    def test_game_list(self):
+        self.assertIndexed('get', '/api/games/', indexes=['game_owner_created_idx'])
+        self.assertIndexed('get', '/api/games/?ordering=created_at',
+                           indexes=['game_owner_created_idx'])
+
+    @mock.patch.object(KeysetPagination, 'page_size', 2)
+    def test_game_list_cursor(self):
+        url = self.client.get('/api/games/').json()['next']
+        self.assertIndexed('get', url, indexes=['game_owner_created_idx'])
+
+    def test_move_list(self):
+        self.assertIndexed('get', '/api/moves/', indexes=['move_owner_game_order_idx'])
+        self.assertIndexed('get', f'/api/moves/?game_id={self.game.id}&ordering=-order')
+
+    @mock.patch.object(KeysetPagination, 'page_size', 2)
+    def test_move_list_cursor(self):
+        url = self.client.get(f'/api/moves/?game_id={self.game.id}').json()['next']
+        self.assertIndexed('get', url)
+
+    def test_move_detail(self):
+        self.assertIndexed('get', f'/api/moves/{self.move.id}/')
+
+    def test_rewind(self):
+        self.assertIndexed('post', f'/api/games/{self.game.id}/rewind/', {'order': 3})
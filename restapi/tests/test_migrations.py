@@ -0,0 +1,148 @@
+from importlib import import_module
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from restapi.sweepergame import SweeperGame, GameStatus, Tile
+
+# rows converted per transaction by 0010_packed_boards
+BATCH_SIZE = import_module('restapi.migrations.0010_packed_boards').BATCH_SIZE
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Migrates the database back to `migrate_from`, lets the test
+    create data with the historical models (see `setUpData`), then
+    applies the migrations up to `migrate_to`."""
+
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.latest = executor.loader.graph.leaf_nodes()
+        executor.migrate(self.migrate_from)
+
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+        self.setUpData(old_apps)
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.latest)
+
+    def setUpData(self, apps):
+        pass
+
+
+class MaterializeCurrentStateMigrationTest(MigrationTestCase):
+
+    migrate_from = [('restapi', '0005_auto_20210605_1416')]
+    migrate_to = [('restapi', '0006_game_current_state')]
+
+    def setUpData(self, apps):
+        User = apps.get_model('auth', 'User')
+        Game = apps.get_model('restapi', 'Game')
+        Move = apps.get_model('restapi', 'Move')
+
+        user = User.objects.create(username='player')
+        game = SweeperGame(8, 8, 10, seed=1)
+        self.initial_tiles = game.tiles
+        mines = [i for i, tile in enumerate(game.board) if tile & Tile.MINE]
+        safe = next(i for i in range(1, 64) if i not in mines)
+
+        self.played = Game.objects.create(
+            owner=user, num_rows=8, num_cols=8, num_mines=10, tiles=game.tiles).id
+        self.moves = [(0, 0, 'F'), (safe // 8, safe % 8, 'R'), (mines[0] // 8, mines[0] % 8, 'R')]
+        for order, (row, col, action) in enumerate(self.moves):
+            Move.objects.create(owner=user, game_id_id=self.played, order=order,
+                                row=row, col=col, action=action)
+
+        self.unplayed = Game.objects.create(
+            owner=user, num_rows=8, num_cols=8, num_mines=10, tiles=game.tiles).id
+
+    def test_current_state_replays_moves(self):
+        Game = self.apps.get_model('restapi', 'Game')
+
+        expected = SweeperGame.from_tile_arr(self.initial_tiles)
+        expected.apply_flag(0, 0)
+        expected.apply_reveal(*self.moves[1][:2])
+        expected.apply_reveal(*self.moves[2][:2])
+
+        game = Game.objects.get(pk=self.played)
+        self.assertEqual(expected.tiles, game.current_tiles)
+        self.assertEqual(GameStatus.USER_LOST.value, game.status)
+        self.assertEqual(3, game.move_count)
+
+    def test_game_without_moves(self):
+        Game = self.apps.get_model('restapi', 'Game')
+
+        game = Game.objects.get(pk=self.unplayed)
+        self.assertEqual(self.initial_tiles, game.current_tiles)
+        self.assertEqual(GameStatus.IN_PROGRESS.value, game.status)
+        self.assertEqual(0, game.move_count)
+
+
+class PackedBoardsMigrationTest(MigrationTestCase):
+
+    migrate_from = [('restapi', '0009_seeded_boards')]
+    migrate_to = [('restapi', '0010_packed_boards')]
+
+    def setUpData(self, apps):
+        User = apps.get_model('auth', 'User')
+        Game = apps.get_model('restapi', 'Game')
+        Checkpoint = apps.get_model('restapi', 'Checkpoint')
+
+        user = User.objects.create(username='player')
+        shapes = [(6, 6, 5), (8, 8, 10), (9, 12, 20), (20, 20, 99)]
+        games = []
+        # more games than are converted per batch
+        for i in range(BATCH_SIZE + 20):
+            num_rows, num_cols, num_mines = shapes[i % len(shapes)]
+            tiles = SweeperGame(num_rows, num_cols, num_mines, seed=i).tiles
+            current_tiles = None
+            if i % 3:
+                current_tiles = [[tile | Tile.VISIBLE for tile in row] for row in tiles]
+            games.append(Game(owner=user, num_rows=num_rows, num_cols=num_cols,
+                              num_mines=num_mines, tiles=tiles, current_tiles=current_tiles))
+        games = Game.objects.bulk_create(games)
+
+        self.seeded = Game.objects.create(
+            owner=user, num_rows=8, num_cols=8, num_mines=10, seed=42, generator_version=1).id
+
+        Checkpoint.objects.bulk_create([
+            Checkpoint(game_id=game, order=24, tiles=game.tiles) for game in games[::50]])
+
+        self.tiles = {game.id: (game.tiles, game.current_tiles) for game in games}
+        self.checkpoints = {game.id: game.tiles for game in games[::50]}
+
+    def assertBoards(self, unpack):
+        Game = self.apps.get_model('restapi', 'Game')
+        Checkpoint = self.apps.get_model('restapi', 'Checkpoint')
+
+        boards = {game.id: (unpack(game.tiles), unpack(game.current_tiles))
+                  for game in Game.objects.exclude(pk=self.seeded)}
+        self.assertEqual(self.tiles, boards)
+
+        seeded = Game.objects.get(pk=self.seeded)
+        self.assertIsNone(seeded.tiles)
+        self.assertIsNone(seeded.current_tiles)
+        self.assertEqual(42, seeded.seed)
+
+        checkpoints = {checkpoint.game_id_id: unpack(checkpoint.tiles)
+                       for checkpoint in Checkpoint.objects.all()}
+        self.assertEqual(self.checkpoints, checkpoints)
+
+    def test_boards_are_packed(self):
+        self.assertBoards(lambda board: None if board is None else board.tiles)
+
+    def test_reverse(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        self.apps = executor.loader.project_state(self.migrate_from).apps
+        self.assertBoards(lambda board: board)
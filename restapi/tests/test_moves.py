@@ -0,0 +1,455 @@
+import threading
+
+from django.db import connection
+from django.test import override_settings
+
+from restapi.fields import PackedBoard
+from restapi.models import Game, Move, Checkpoint
+from restapi.sweepergame import SweeperGame, GameStatus, Tile
+from restapi.tests.base import GameTestCase, GameTransactionTestCase
+
+class ConcurrentMoveTest(GameTransactionTestCase):
+
+    num_rows = 16
+    num_cols = 16
+    num_mines = 40
+
+    def post_flag(self, row, col, responses):
+        client = self.login(self.user)
+        try:
+            # retry moves rejected because of a concurrent move
+            res = None
+            while res is None or res.status_code == 409:
+                res = client.post('/api/moves/', {
+                    'game_id': self.game.id,
+                    'row': row,
+                    'col': col,
+                    'action': Move.FLAG,
+                }, format='json')
+            responses.append(res)
+        finally:
+            connection.close()
+
+    def test_parallel_moves_get_distinct_orders(self):
+        tiles = self.game.initial_board.tiles
+        coords = [(r, c) for r in range(16) for c in range(16)
+                  if not tiles[r][c] & Tile.MINE][:8]
+        responses = []
+        threads = [threading.Thread(target=self.post_flag, args=(r, c, responses))
+                   for r, c in coords]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([201] * len(coords), [res.status_code for res in responses])
+
+        self.game.refresh_from_db()
+        self.assertEqual(len(coords), self.game.move_count)
+        self.assertEqual(
+            list(range(len(coords))),
+            list(Move.objects.filter(game_id=self.game).values_list('order', flat=True)))
+
+        flagged = [(r, c) for r, row in enumerate(self.game.current_tiles.tiles)
+                   for c, tile in enumerate(row) if tile & Tile.FLAG]
+        self.assertEqual(sorted(coords), flagged)
+        self.assertIsNotNone(self.game.start_time)
+
+    def test_save_requires_order(self):
+        with self.assertRaises(ValueError):
+            Move.objects.create(owner=self.user, game_id=self.game, row=0, col=0)
+
+        self.game.refresh_from_db()
+        self.assertEqual(0, self.game.move_count)
+        self.assertEqual(0, self.game.version)
+        self.assertFalse(Move.objects.filter(game_id=self.game).exists())
+
+
+class MaterializedStateTest(GameTestCase):
+
+    num_rows = 16
+    num_cols = 16
+    num_mines = 40
+
+    def replay(self) -> SweeperGame:
+        game = self.game.get_initial_game()
+        for move in Move.objects.filter(game_id=self.game).order_by('order'):
+            if move.action == Move.REVEAL:
+                game.apply_reveal(move.row, move.col)
+            else:
+                game.apply_flag(move.row, move.col)
+        return game
+
+    def assertMatchesReplay(self):
+        self.game.refresh_from_db()
+        game = self.replay()
+        self.assertEqual(PackedBoard.from_game(game), self.game.current_tiles)
+        self.assertEqual(game.status.value, self.game.status)
+        self.assertEqual(Move.objects.filter(game_id=self.game).count(), self.game.move_count)
+
+    def test_state_matches_replay(self):
+        board = self.game.initial_board.board
+        mines = [i for i, tile in enumerate(board) if tile & Tile.MINE]
+        safe = [i for i, tile in enumerate(board) if not tile & Tile.MINE]
+
+        for i, action in [(mines[0], Move.FLAG), (safe[0], Move.REVEAL),
+                          (mines[1], Move.FLAG), (mines[0], Move.FLAG)]:
+            self.assertEqual(201, self.post_move(i // 16, i % 16, action).status_code)
+            self.assertMatchesReplay()
+
+        self.assertIsNotNone(self.game.start_time)
+        self.assertIsNone(self.game.end_time)
+
+        self.assertEqual(201, self.post_move(mines[2] // 16, mines[2] % 16, Move.REVEAL).status_code)
+        self.assertMatchesReplay()
+        self.assertEqual(GameStatus.USER_LOST.value, self.game.status)
+        self.assertIsNotNone(self.game.end_time)
+
+    def test_invalid_move_keeps_state(self):
+        self.post_move(0, 0)
+        self.assertEqual(400, self.post_move(16, 0).status_code)
+        self.assertMatchesReplay()
+        self.assertEqual(1, self.game.move_count)
+
+
+class PlayedGameTestCase(GameTestCase):
+    """Plays `num_flags + 1` moves before each test: one reveal,
+    then flags on tiles it left hidden."""
+
+    num_rows = 16
+    num_cols = 16
+    num_mines = 40
+    num_flags = 11
+
+    def setUp(self):
+        super().setUp()
+        game = self.game.get_initial_game()
+        safe = next(i for i, tile in enumerate(game.board) if not tile & Tile.MINE)
+        game.apply_reveal(safe // 16, safe % 16)
+        self.hidden = [i for i, tile in enumerate(game.board) if not tile & Tile.VISIBLE]
+
+        self.moves = [(safe // 16, safe % 16, Move.REVEAL)]
+        self.moves += [(i // 16, i % 16, Move.FLAG) for i in self.hidden[:self.num_flags]]
+        for row, col, action in self.moves:
+            self.assertEqual(201, self.post_move(row, col, action).status_code)
+
+    def replay(self, count: int) -> SweeperGame:
+        """Replay the first `count` moves from the initial board."""
+        game = self.game.get_initial_game()
+        for row, col, action in self.moves[:count]:
+            if action == Move.REVEAL:
+                game.apply_reveal(row, col)
+            else:
+                game.apply_flag(row, col)
+        return game
+
+
+@override_settings(SWEEPER_CHECKPOINT_INTERVAL=5)
+class CheckpointTest(PlayedGameTestCase):
+
+    def test_checkpoint_every_interval(self):
+        checkpoints = Checkpoint.objects.filter(game_id=self.game).order_by('order')
+        self.assertEqual([4, 9], [checkpoint.order for checkpoint in checkpoints])
+        for checkpoint in checkpoints:
+            self.assertEqual(PackedBoard.from_game(self.replay(checkpoint.order + 1)),
+                             checkpoint.tiles)
+
+    def test_move_detail_matches_replay(self):
+        for move in Move.objects.filter(game_id=self.game):
+            res = self.client.get(f'/api/moves/{move.id}/')
+            self.assertEqual(200, res.status_code)
+            game = self.replay(move.order + 1)
+            self.assertEqual(game.tiles, res.json()['state']['tiles'], move.order)
+            self.assertEqual(game.status.value, res.json()['state']['status'])
+
+    def test_move_detail_starts_from_checkpoint(self):
+        # a checkpoint that disagrees with the history shows
+        # which board the state is rebuilt from
+        checkpoint = Checkpoint.objects.get(game_id=self.game, order=4)
+        game = checkpoint.tiles.to_game()
+        game.board[0] ^= Tile.FLAG
+        Checkpoint.objects.filter(pk=checkpoint.pk).update(tiles=PackedBoard.from_game(game))
+
+        for order, changed in [(3, False), (4, True), (8, True), (9, False)]:
+            move = Move.objects.get(game_id=self.game, order=order)
+            tiles = self.client.get(f'/api/moves/{move.id}/').json()['state']['tiles']
+            expected = self.replay(order + 1).board[0]
+            self.assertEqual(changed, tiles[0][0] != expected, order)
+
+
+@override_settings(SWEEPER_CHECKPOINT_INTERVAL=5)
+class RewindTest(PlayedGameTestCase):
+
+    num_flags = 7
+
+    def rewind(self, **data):
+        return self.client.post(f'/api/games/{self.game.id}/rewind/', data, format='json')
+
+    def assertRewoundTo(self, count: int, res):
+        self.assertEqual(200, res.status_code)
+        game = self.replay(count)
+        self.assertEqual(count, res.json()['move_count'])
+        self.assertEqual(game.tiles, res.json()['state']['tiles'])
+        self.assertEqual(game.status.value, res.json()['state']['status'])
+
+        self.game.refresh_from_db()
+        self.assertEqual(count, self.game.move_count)
+        self.assertEqual(game.status.value, self.game.status)
+        self.assertEqual(
+            list(range(count)),
+            list(Move.objects.filter(game_id=self.game).values_list('order', flat=True)))
+        if count:
+            self.assertEqual(PackedBoard.from_game(game), self.game.current_tiles)
+
+    def checkpoint_orders(self):
+        return list(Checkpoint.objects.filter(game_id=self.game).values_list('order', flat=True))
+
+    def test_rewind_latest_move(self):
+        self.assertRewoundTo(7, self.rewind())
+        self.assertRewoundTo(6, self.rewind())
+
+    def test_rewind_to_order(self):
+        self.assertEqual([4], self.checkpoint_orders())
+        self.assertRewoundTo(5, self.rewind(order=4))
+        self.assertEqual([4], self.checkpoint_orders())
+        self.assertRewoundTo(3, self.rewind(order=2))
+        self.assertEqual([], self.checkpoint_orders())
+
+        # play goes on from the rewound state
+        res = self.post_move(*self.moves[3])
+        self.assertEqual(201, res.status_code)
+        self.assertEqual(self.replay(4).tiles, res.json()['state']['tiles'])
+        self.assertTrue(Move.objects.filter(game_id=self.game, order=3).exists())
+
+    def test_rewind_every_move(self):
+        self.assertRewoundTo(0, self.rewind(order=-1))
+        self.assertIsNone(self.game.current_tiles)
+        self.assertIsNone(self.game.start_time)
+        self.assertEqual([], self.checkpoint_orders())
+
+        self.assertEqual(400, self.rewind().status_code)
+
+    def test_rewind_finished_game(self):
+        mine = next(i for i in self.hidden if self.game.initial_board.board[i] & Tile.MINE
+                    and (i // 16, i % 16, Move.FLAG) not in self.moves)
+        self.moves.append((mine // 16, mine % 16, Move.REVEAL))
+        self.assertEqual(201, self.post_move(*self.moves[-1]).status_code)
+        self.game.refresh_from_db()
+        self.assertEqual(GameStatus.USER_LOST.value, self.game.status)
+        self.assertIsNotNone(self.game.end_time)
+
+        self.assertRewoundTo(8, self.rewind())
+        self.assertEqual(GameStatus.IN_PROGRESS.value, self.game.status)
+        self.assertIsNone(self.game.end_time)
+        self.assertIsNotNone(self.game.start_time)
+
+    def test_invalid_order(self):
+        for order in [-2, 8, 100, 'last', None, [1]]:
+            with self.subTest(order=order):
+                self.assertEqual(400, self.rewind(order=order).status_code)
+
+        self.game.refresh_from_db()
+        self.assertEqual(8, self.game.move_count)
+        self.assertEqual(8, self.game.version)
+        self.assertEqual(8, Move.objects.filter(game_id=self.game).count())
+
+    def test_other_users_game(self):
+        other = self.login(self.create_user('other'))
+        res = other.post(f'/api/games/{self.game.id}/rewind/', {}, format='json')
+        self.assertEqual(404, res.status_code)
+        self.assertEqual(8, Move.objects.filter(game_id=self.game).count())
+
+
+class GameVersionTest(GameTransactionTestCase):
+
+    def test_moves_increment_version(self):
+        res = self.post_move(version=0)
+        self.assertEqual(201, res.status_code)
+        self.assertEqual(1, res.json()['version'])
+
+        res = self.post_move()
+        self.assertEqual(201, res.status_code)
+        self.assertEqual(2, res.json()['version'])
+
+    def test_stale_version_conflicts(self):
+        self.post_move()
+        res = self.post_move(version=0)
+        self.assertEqual(409, res.status_code)
+        self.assertEqual(1, res.json()['version'])
+
+        self.game.refresh_from_db()
+        self.assertEqual(1, self.game.move_count)
+        self.assertEqual(1, Move.objects.filter(game_id=self.game).count())
+
+    def test_invalid_version(self):
+        self.assertEqual(400, self.post_move(version='latest').status_code)
+
+    def test_other_users_game(self):
+        owner_client = self.client
+        self.client = self.login(self.create_user('other'))
+        self.assertEqual(404, self.post_move().status_code)
+        self.assertEqual(404, self.post_move(url='/api/moves/?response=changes').status_code)
+        # through the serializer
+        self.assertEqual(404, self.post_move(row='0').status_code)
+
+        self.game.refresh_from_db()
+        self.assertEqual(0, self.game.move_count)
+        self.assertEqual(0, self.game.version)
+        self.assertIsNone(self.game.current_tiles)
+        self.assertFalse(Move.objects.filter(game_id=self.game).exists())
+
+        self.client = owner_client
+        self.assertEqual(201, self.post_move().status_code)
+
+    def test_unknown_game(self):
+        self.assertEqual(404, self.post_move(game_id=self.game.id + 1).status_code)
+
+    def test_invalid_game_id(self):
+        for game_id in [None, [], {}, 'first', '']:
+            with self.subTest(game_id=game_id):
+                self.assertEqual(400, self.post_move(game_id=game_id).status_code)
+                # through the serializer
+                self.assertEqual(400, self.post_move(game_id=game_id, row='0').status_code)
+
+        self.game.refresh_from_db()
+        self.assertEqual(0, self.game.move_count)
+
+    def test_save_versioned_rejects_stale_instance(self):
+        stale = Game.objects.get(pk=self.game.pk)
+        self.post_move()
+
+        stale.move_count = 5
+        self.assertFalse(stale.save_versioned(['move_count']))
+        self.game.refresh_from_db()
+        self.assertEqual(1, self.game.move_count)
+        self.assertEqual(1, self.game.version)
+
+    def test_rewind_checks_version(self):
+        self.post_move()
+        self.post_move()
+
+        url = f'/api/games/{self.game.id}/rewind/'
+        self.assertEqual(409, self.client.post(url, {'version': 1}, format='json').status_code)
+
+        res = self.client.post(url, {'version': 2}, format='json')
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(3, res.json()['version'])
+        self.assertEqual(1, res.json()['move_count'])
+
+
+@override_settings(SWEEPER_CHECKPOINT_INTERVAL=5)
+class BatchMoveTest(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.safe = [(r, c) for r, row in enumerate(self.game.initial_board.tiles)
+                     for c, tile in enumerate(row) if not tile & Tile.MINE]
+
+    def post_batch(self, moves, url='/api/moves/batch/', **data):
+        return self.client.post(url, dict({
+            'game_id': self.game.id,
+            'moves': [{'row': r, 'col': c, 'action': a} for r, c, a in moves],
+        }, **data), format='json')
+
+    def test_batch_matches_single_moves(self):
+        moves = [(r, c, Move.FLAG) for r, c in self.safe[:7]] + [(0, 0, Move.FLAG)]
+        res = self.post_batch(moves)
+        self.assertEqual(201, res.status_code)
+        self.assertEqual(8, res.json()['move_count'])
+        self.assertEqual(1, res.json()['version'])
+        self.assertEqual(list(range(8)), [move['order'] for move in res.json()['moves']])
+
+        game = self.game.get_initial_game()
+        for r, c, a in moves:
+            game.apply_flag(r, c)
+        self.assertEqual(game.tiles, res.json()['state']['tiles'])
+
+        self.game.refresh_from_db()
+        self.assertEqual(game.tiles, self.game.current_tiles.tiles)
+        self.assertEqual(
+            [4], list(Checkpoint.objects.filter(game_id=self.game).values_list('order', flat=True)))
+
+        # the history can be replayed as usual
+        last = Move.objects.get(game_id=self.game, order=7)
+        self.assertEqual(game.tiles, self.client.get(f'/api/moves/{last.id}/').json()['state']['tiles'])
+
+    def test_changes_response(self):
+        r, c = self.safe[0]
+        res = self.post_batch([(r, c, Move.FLAG), (r, c, Move.FLAG)],
+                              url='/api/moves/batch/?response=changes')
+        self.assertEqual(201, res.status_code)
+        self.assertNotIn('tiles', res.json()['state'])
+
+        index = r * 8 + c
+        tile = self.game.initial_board.tiles[r][c]
+        self.assertEqual([[index, tile | Tile.FLAG]], res.json()['moves'][0]['changes'])
+        self.assertEqual([[index, tile]], res.json()['moves'][1]['changes'])
+
+    def test_invalid_move_rejects_batch(self):
+        r, c = self.safe[0]
+        res = self.post_batch([(r, c, Move.REVEAL), (r, c, Move.REVEAL)])
+        self.assertEqual(400, res.status_code)
+        self.assertEqual(['1'], list(res.json()['moves']))
+
+        self.game.refresh_from_db()
+        self.assertEqual(0, self.game.move_count)
+        self.assertIsNone(self.game.current_tiles)
+        self.assertFalse(Move.objects.filter(game_id=self.game).exists())
+
+    def test_version_conflict(self):
+        self.post_batch([(0, 0, Move.FLAG)])
+        res = self.post_batch([(0, 0, Move.FLAG)], version=0)
+        self.assertEqual(409, res.status_code)
+        self.assertEqual(1, res.json()['version'])
+
+    def test_other_users_game(self):
+        self.client = self.login(self.create_user('other'))
+        self.assertEqual(404, self.post_batch([(0, 0, Move.FLAG)]).status_code)
+        self.game.refresh_from_db()
+        self.assertEqual(0, self.game.move_count)
+        self.assertFalse(Move.objects.filter(game_id=self.game).exists())
+
+    def test_unknown_game(self):
+        self.assertEqual(404, self.post_batch([(0, 0, Move.FLAG)], game_id=self.game.id + 1).status_code)
+
+    def test_invalid_body(self):
+        self.assertEqual(400, self.post_batch([]).status_code)
+        self.assertEqual(400, self.post_batch([(0, 0, 'X')]).status_code)
+        self.assertEqual(400, self.post_batch([(0, 0, Move.FLAG)] * 501).status_code)
+
+
+class MoveChangesResponseTest(GameTestCase):
+
+    num_rows = 16
+    num_cols = 16
+    num_mines = 40
+
+    def post_changes(self, row, col, action, url='/api/moves/?response=changes'):
+        res = self.post_move(row, col, action, url=url)
+        self.assertEqual(201, res.status_code)
+        return res.json()
+
+    def test_flag_changes(self):
+        tile = self.game.initial_board.tiles[2][3]
+        res = self.post_changes(2, 3, Move.FLAG)
+        self.assertEqual([[2 * 16 + 3, tile | Tile.FLAG]], res['changes'])
+        self.assertEqual({'status': 0}, res['state'])
+        self.assertEqual(1, res['version'])
+
+    def test_changes_apply_to_previous_board(self):
+        board = [value for row in self.game.initial_board.tiles for value in row]
+        mines = {i for i, value in enumerate(board) if value & Tile.MINE}
+        index = next(i for i in range(len(board)) if i not in mines)
+
+        res = self.post_changes(index // 16, index % 16, Move.REVEAL)
+        self.assertTrue(res['changes'])
+        for i, value in res['changes']:
+            board[i] = value
+
+        self.game.refresh_from_db()
+        self.assertEqual(bytes(board), self.game.current_tiles.board)
+
+    def test_full_board_by_default(self):
+        res = self.post_changes(0, 0, Move.FLAG, url='/api/moves/')
+        self.assertNotIn('changes', res)
+        self.assertEqual(16, len(res['state']['tiles']))
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from restapi.models import Game, Move
+from restapi.pagination import KeysetPagination
+from restapi.tests.base import GameTestCase
+
+@mock.patch.object(KeysetPagination, 'page_size', 3)
+class KeysetPaginationTest(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.games = [self.game] + [self.create_game() for _ in range(7)]
+        # games created at the same time are ordered by id
+        Game.objects.filter(pk__in=[game.pk for game in self.games[2:6]]).update(
+            created_at=self.games[2].created_at)
+
+    def get_all(self, url):
+        ids = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(200, res.status_code)
+            ids.extend(item['id'] for item in res.json()['results'])
+            url = res.json()['next']
+        return ids
+
+    def test_game_pages(self):
+        expected = [game.id for game in reversed(self.games)]
+        self.assertEqual(expected, self.get_all('/api/games/'))
+        self.assertEqual(expected[::-1], self.get_all('/api/games/?ordering=created_at'))
+
+    def test_previous_pages(self):
+        res = self.client.get('/api/games/')
+        self.assertIsNone(res.json()['previous'])
+        res = self.client.get(res.json()['next'])
+        res = self.client.get(res.json()['next'])
+        self.assertIsNone(res.json()['next'])
+
+        ids = [game.id for game in reversed(self.games)]
+        last_page = [item['id'] for item in res.json()['results']]
+        self.assertEqual(ids[6:], last_page)
+
+        # walk back to the first page
+        pages = []
+        url = res.json()['previous']
+        while url:
+            res = self.client.get(url)
+            pages.insert(0, [item['id'] for item in res.json()['results']])
+            url = res.json()['previous']
+        self.assertEqual([ids[0:3], ids[3:6]], pages)
+
+    def test_move_pages(self):
+        game = self.games[0]
+        for col in range(7):
+            self.client.post('/api/moves/', {
+                'game_id': game.id, 'row': 0, 'col': col, 'action': Move.FLAG,
+            }, format='json')
+
+        orders = [move['order'] for move in self.client.get(
+            f'/api/moves/?game_id={game.id}&ordering=-order').json()['results']]
+        self.assertEqual([6, 5, 4], orders)
+
+        moves = Move.objects.filter(game_id=game).order_by('order')
+        self.assertEqual([move.id for move in moves], self.get_all(f'/api/moves/?game_id={game.id}'))
+
+    def test_no_count_query(self):
+        res = self.client.get('/api/games/')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(res.json()['next'])
+        self.assertEqual(1, len(context))
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'])
+        self.assertNotIn('OFFSET', context.captured_queries[0]['sql'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(404, self.client.get('/api/games/?cursor=abc').status_code)
+        # valid encoding, but not a date
+        self.assertEqual(404, self.client.get(
+            '/api/games/?cursor=eyJwIjpbIngiLDFdLCJyIjowfQ==').status_code)
+
+    def test_unsupported_ordering(self):
+        self.assertEqual(400, self.client.get('/api/games/?ordering=num_rows').status_code)
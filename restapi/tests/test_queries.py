@@ -0,0 +1,142 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from restapi.cache import game_cache
+from restapi.models import Game, Move, Checkpoint
+from restapi.tests.base import GameTestCase, with_shared_game_cache
+
+class ListQueryTest(GameTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post_move()
+
+    def get_selects(self, url, table):
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url)
+        self.assertEqual(200, res.status_code)
+
+        return [query['sql'] for query in context.captured_queries
+                if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']]
+
+    def test_game_list_selects_no_tiles(self):
+        selects = self.get_selects('/api/games/', 'restapi_game')
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('tiles', sql)
+            self.assertNotIn('seed', sql)
+
+    def test_game_detail_selects_initial_tiles_only(self):
+        selects = self.get_selects(f'/api/games/{self.game.id}/', 'restapi_game')
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertIn('"restapi_game"."tiles"', sql)
+            self.assertNotIn('current_tiles', sql)
+
+    def test_move_list_selects_no_delta(self):
+        selects = self.get_selects(f'/api/moves/?game_id={self.game.id}', 'restapi_move')
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('delta', sql)
+
+
+
+@override_settings(SWEEPER_CHECKPOINT_INTERVAL=25)
+class QueryBudgetTest(GameTestCase):
+    """Upper bounds on the number of SQL queries made by each
+    API route, for games with a realistic move history. The
+    budgets must not grow with the number of games or moves.
+    """
+
+    # moves played before each test; spans several checkpoints
+    HISTORY_LENGTH = 60
+
+    num_rows = 16
+    num_cols = 16
+    num_mines = 40
+
+    def setUp(self):
+        super().setUp()
+        for _ in range(2):
+            self.create_game()
+
+        # flag and unflag the same tile, so that the game goes on
+        for _ in range(self.HISTORY_LENGTH):
+            self.post_move()
+        self.move = Move.objects.filter(game_id=self.game).order_by('-order')[1]
+
+    def post_move(self, *args, **kwargs):
+        # let the game cache see the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            res = super().post_move(*args, **kwargs)
+        self.assertEqual(201, res.status_code)
+        return res
+
+    def assertMaxQueries(self, budget, method, url, data=None, status=200):
+        with CaptureQueriesContext(connection) as context:
+            res = getattr(self.client, method)(url, data, format='json')
+
+        self.assertEqual(status, res.status_code)
+        self.assertLessEqual(
+            len(context), budget,
+            '\n'.join(query['sql'] for query in context.captured_queries))
+
+    def test_api_root(self):
+        self.assertMaxQueries(0, 'get', '/api/')
+
+    def test_game_list(self):
+        self.assertMaxQueries(1, 'get', '/api/games/')
+
+    def test_game_create(self):
+        self.assertMaxQueries(1, 'post', '/api/games/', {
+            'num_rows': 9, 'num_cols': 9, 'num_mines': 10,
+        }, status=201)
+
+    def test_game_detail(self):
+        self.assertMaxQueries(1, 'get', f'/api/games/{self.game.id}/')
+
+    def test_game_rewind(self):
+        self.assertMaxQueries(7, 'post', f'/api/games/{self.game.id}/rewind/', {
+            'order': 10,
+        })
+
+    def test_move_list(self):
+        self.assertMaxQueries(1, 'get', f'/api/moves/?game_id={self.game.id}')
+
+    def test_move_create(self):
+        self.assertMaxQueries(5, 'post', '/api/moves/', {
+            'game_id': self.game.id, 'row': 0, 'col': 0, 'action': Move.FLAG,
+        }, status=201)
+
+    @with_shared_game_cache
+    def test_move_create_shared_cache(self):
+        self.post_move()
+        # the previous move was handled by another process
+        game_cache.clear()
+        self.assertMaxQueries(5, 'post', '/api/moves/', {
+            'game_id': self.game.id, 'row': 0, 'col': 0, 'action': Move.FLAG,
+        }, status=201)
+
+    def test_move_create_uncached(self):
+        game_cache.clear()
+        self.assertMaxQueries(6, 'post', '/api/moves/', {
+            'game_id': self.game.id, 'row': 0, 'col': 0, 'action': Move.FLAG,
+        }, status=201)
+
+    def test_move_create_with_checkpoint(self):
+        while not Checkpoint.is_due(Game.objects.get(pk=self.game.id).move_count):
+            self.post_move()
+
+        self.assertMaxQueries(6, 'post', '/api/moves/', {
+            'game_id': self.game.id, 'row': 0, 'col': 0, 'action': Move.FLAG,
+        }, status=201)
+
+    def test_move_detail(self):
+        self.assertMaxQueries(3, 'get', f'/api/moves/{self.move.id}/')
+
+    def test_move_batch(self):
+        self.assertMaxQueries(6, 'post', '/api/moves/batch/', {
+            'game_id': self.game.id,
+            'moves': [{'row': 0, 'col': 0, 'action': Move.FLAG}] * 60,
+        }, status=201)
@@ -0,0 +1,68 @@
+import base64
+import unittest
+
+from restapi.fields import PackedBoard
+from restapi.models import Move
+from restapi.renderers import msgpack
+from restapi.tests.base import GameTestCase
+
+class BoardRendererTest(GameTestCase):
+
+    num_rows = 9
+    num_cols = 12
+
+    def setUp(self):
+        super().setUp()
+        self.post_move(1, 2)
+        self.game.refresh_from_db()
+        self.move = Move.objects.get(game_id=self.game)
+
+    def get(self, url, accept):
+        res = self.client.get(url, HTTP_ACCEPT=accept)
+        self.assertEqual(200, res.status_code)
+        self.assertTrue(res['Content-Type'].startswith(accept))
+        return res
+
+    def test_json(self):
+        res = self.get(f'/api/games/{self.game.id}/', 'application/json')
+        self.assertEqual(self.game.initial_board.tiles, res.json()['tiles'])
+
+        res = self.get(f'/api/moves/{self.move.id}/', 'application/json')
+        self.assertEqual(self.game.current_tiles.tiles, res.json()['state']['tiles'])
+
+    def test_packed(self):
+        accept = 'application/vnd.sweeper.packed+json'
+        res = self.get(f'/api/games/{self.game.id}/', accept)
+        self.assertEqual(self.game.initial_board.raw, base64.b64decode(res.json()['tiles']))
+
+        res = self.get(f'/api/moves/{self.move.id}/', accept)
+        self.assertEqual(self.game.current_tiles.raw,
+                         base64.b64decode(res.json()['state']['tiles']))
+
+    def test_rle(self):
+        accept = 'application/vnd.sweeper.rle+json'
+        res = self.get(f'/api/games/{self.game.id}/', accept)
+        self.assertEqual(self.game.initial_board, PackedBoard.from_rle(res.json()['tiles']))
+        self.assertEqual(res.json(), self.client.get(
+            f'/api/games/{self.game.id}/?format=rle').json())
+
+        res = self.get(f'/api/moves/{self.move.id}/', accept)
+        self.assertEqual(self.game.current_tiles, PackedBoard.from_rle(res.json()['state']['tiles']))
+
+    def test_new_move(self):
+        res = self.client.post('/api/moves/', {
+            'game_id': self.game.id, 'row': 1, 'col': 2, 'action': Move.FLAG,
+        }, format='json', HTTP_ACCEPT='application/vnd.sweeper.rle+json')
+        self.assertEqual(201, res.status_code)
+        self.assertEqual(self.game.initial_board, PackedBoard.from_rle(res.json()['state']['tiles']))
+
+    def test_browsable_api(self):
+        res = self.client.get(f'/api/games/{self.game.id}/', HTTP_ACCEPT='text/html')
+        self.assertEqual(200, res.status_code)
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack(self):
+        res = self.get(f'/api/games/{self.game.id}/', 'application/msgpack')
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(self.game.initial_board.raw, data['tiles'])
+        self.assertEqual(self.game.id, data['id'])
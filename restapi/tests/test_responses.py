@@ -0,0 +1,82 @@
+import datetime
+import unittest
+
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+from restapi.fields import PackedBoard
+from restapi.models import Move
+from restapi.renderers import BoardJSONRenderer, orjson
+from restapi.serializers import GameDetailSerializer, MoveCreateSerializer, \
+    MoveCreateChangesSerializer, game_detail_data, move_create_data
+from restapi.tests.base import GameTestCase
+
+class HandBuiltResponseTest(GameTestCase):
+    """The hand-built responses must match the serializers exactly."""
+
+    num_cols = 10
+
+    def assertSameData(self, expected, data):
+        self.assertEqual(dict(expected), data)
+        self.assertEqual(list(expected), list(data))
+
+    def test_game_detail(self):
+        self.assertSameData(GameDetailSerializer(self.game).data, game_detail_data(self.game))
+
+        self.game.start_time = now()
+        self.game.end_time = self.game.start_time.replace(microsecond=0)
+        self.assertSameData(GameDetailSerializer(self.game).data, game_detail_data(self.game))
+
+    def test_game_detail_response(self):
+        res = self.client.get(f'/api/games/{self.game.id}/')
+        self.assertEqual(200, res.status_code)
+        self.assertEqual(self.render(GameDetailSerializer(self.game).data), res.content)
+
+    def test_new_move(self):
+        res = self.post_move(2, 3)
+        self.assertEqual(201, res.status_code)
+
+        move = Move.objects.select_related('game_id').get(game_id=self.game)
+        self.assertSameData(MoveCreateSerializer(move).data, move_create_data(move))
+        self.assertSameData(MoveCreateChangesSerializer(move).data, move_create_data(move, True))
+        self.assertEqual(self.render(MoveCreateSerializer(move).data), res.content)
+
+    def test_invalid_move_uses_serializer(self):
+        res = self.post_move(25, 3)
+        self.assertEqual(400, res.status_code)
+        self.assertIn('row', res.json())
+
+        res = self.post_move('2', '3')
+        self.assertEqual(201, res.status_code)
+
+    def render(self, data):
+        return BoardJSONRenderer().render(data, 'application/json')
+
+
+@unittest.skipIf(orjson is None, 'orjson is not installed')
+class OrjsonRendererTest(unittest.TestCase):
+
+    def assertSameBytes(self, data):
+        expected = JSONRenderer.render(BoardJSONRenderer(), data, 'application/json')
+        self.assertEqual(expected, BoardJSONRenderer().render(data, 'application/json'))
+
+    def test_same_bytes(self):
+        self.assertSameBytes({
+            'id': 1,
+            'text': 'café \u2028 \u2029 "quoted" \\ \n',
+            'none': None,
+            'flag': True,
+            'nested': [{'a': [1, 2]}, []],
+            'when': datetime.datetime(2021, 6, 5, 5, 4, 22, 273316, tzinfo=datetime.timezone.utc),
+            'tiles': PackedBoard.from_tiles([[0, 1], [9, 10]]),
+        })
+
+    def test_non_string_keys(self):
+        self.assertSameBytes({'moves': {0: ['Invalid move']}})
+
+    def test_indent(self):
+        renderer = BoardJSONRenderer()
+        data = {'tiles': PackedBoard.from_tiles([[0, 1], [9, 10]])}
+        self.assertEqual(
+            JSONRenderer.render(renderer, data, 'application/json; indent=4'),
+            renderer.render(data, 'application/json; indent=4'))
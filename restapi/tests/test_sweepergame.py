@@ -1,8 +1,10 @@
+import random
 import unittest
 
 from restapi import const
 from restapi.exceptions import InvalidMoveException, GameOverException
-from restapi.sweepergame import SweeperGame, Tile, GameStatus
+from restapi.sweepergame import SweeperGame, Tile, GameStatus, \
+    neighbor_counts, neighbor_table, sample_indices, seeded_board
 
 class TestSweeperGame(unittest.TestCase):
 
@@ -41,6 +43,81 @@ class TestSweeperGame(unittest.TestCase):
                         mines += 1
             self.assertEqual(m, mines)
 
+    def test_new_game_dense(self):
+        """Boards where almost every tile is a mine"""
+        for r, c, m in [(6, 6, 35), (20, 20, 399)]:
+            game = SweeperGame(r, c, m)
+            mines = sum(1 for t in game.board if Tile.is_mine(t))
+            self.assertEqual(m, mines)
+            self.assertEqual(r * c - m, game.hidden_safe)
+
+            for i, row in enumerate(game.tiles):
+                for j, tile in enumerate(row):
+                    expected = self.neighbor_count(game.tiles, i, j)
+                    self.assertEqual(expected, Tile.count_neighbors(tile))
+
+    def test_neighbor_counts(self):
+        mines = bytearray([
+            1, 0, 0,
+            0, 0, 0,
+            0, 1, 1,
+            0, 0, 0,
+        ])
+        expected = [
+            0, 1, 0,
+            2, 3, 2,
+            1, 1, 1,
+            1, 2, 2,
+        ]
+        self.assertListEqual(expected, list(neighbor_counts(mines, 4, 3)))
+
+    def test_neighbor_table(self):
+        for r, c in [(1, 1), (1, 5), (5, 1), (2, 2), (6, 6), (7, 13)]:
+            table = neighbor_table(r, c)
+            self.assertEqual(r * c, len(table.classes))
+
+            for i in range(r * c):
+                row, col = divmod(i, c)
+                expected = [
+                    (row+dr) * c + col+dc
+                    for dr in (-1, 0, 1)
+                    for dc in (-1, 0, 1)
+                    if (dr, dc) != (0, 0)
+                    and 0 <= row+dr < r and 0 <= col+dc < c
+                ]
+                actual = [i+d for d in table.offsets[table.classes[i]]]
+                self.assertListEqual(sorted(expected), sorted(actual))
+
+        # tables are built once per board shape
+        self.assertIs(neighbor_table(7, 13), neighbor_table(7, 13))
+
+    def test_sample_indices(self):
+        rng = random.Random(0)
+        for n, k in [(10, 0), (10, 1), (10, 10), (400, 399), (1000, 30)]:
+            picked = sample_indices(n, k, rng.random)
+            self.assertEqual(k, len(picked))
+            self.assertEqual(k, len(set(picked)))
+            self.assertTrue(all(0 <= i < n for i in picked))
+
+    def test_seeded_board_is_deterministic(self):
+        for r, c, m in [(6, 6, 6), (20, 20, 99), (20, 20, 399)]:
+            game = SweeperGame.from_seed(r, c, m, 1234)
+            again = SweeperGame(r, c, m, seed=1234)
+            self.assertEqual(game.board, again.board)
+            self.assertEqual(m, sum(1 for t in game.board if Tile.is_mine(t)))
+            self.assertEqual(GameStatus.IN_PROGRESS, game.status)
+
+        self.assertNotEqual(seeded_board(20, 20, 99, 1), seeded_board(20, 20, 99, 2))
+
+    def test_seeded_board_generator_version_1(self):
+        """Seeded games are stored as (version, seed), so the boards
+        generated by a given version must never change."""
+        game = SweeperGame.from_seed(6, 6, 6, 42, version=1)
+        mines = [i for i, t in enumerate(game.board) if Tile.is_mine(t)]
+        self.assertListEqual([1, 10, 11, 23, 25, 27], mines)
+
+        self.assertRaises(ValueError, seeded_board, 6, 6, 6, 42, 99)
+
     def test_new_game_all_tiles_hidden(self):
         game = SweeperGame(10, 10, 30)
         for row in game.tiles:
@@ -441,3 +518,174 @@ class TestSweeperGame(unittest.TestCase):
         res = gm.get_neighbors_to_reveal(5, 2)
         expected = [(5,1), (5,3), (4,1), (4,2), (4,3)]
         self.assertListEqual(sorted(expected), sorted(res))
+
+    def test_set_flag_delta(self):
+        gm = SweeperGame.from_tile_arr([
+            [1, 8, 0, 0, 0, 0],
+            [8, 8, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 8, 8],
+            [0, 0, 0, 0, 8, 1],
+            [0, 0, 0, 0, 8, 8],
+        ])
+        clone = gm.set_flag(2, 3)
+        self.assertListEqual([15], clone.delta)
+
+    def test_reveal_tile_delta(self):
+        gm = SweeperGame.from_tile_arr([
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [8, 8, 8, 8, 8, 8],
+            [8, 1, 8, 8, 1, 8],
+            [8, 8, 8, 8, 8, 8],
+            [0, 0, 0, 0, 0, 0],
+        ])
+        clone = gm.reveal_tile(2, 1)
+        self.assertListEqual([13], clone.delta)
+
+        clone = gm.reveal_tile(0, 0)
+        self.assertListEqual(list(range(18)), sorted(clone.delta))
+
+    def test_apply_deltas(self):
+        gm = SweeperGame.from_tile_arr([
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [8, 8, 8, 8, 8, 8],
+            [8, 1, 8, 8, 1, 8],
+            [8, 8, 8, 8, 8, 8],
+            [0, 0, 0, 0, 0, 0],
+        ])
+        flagged = gm.set_flag(3, 1)
+        revealed = flagged.reveal_tile(0, 0)
+        deltas = [(flagged.delta, Tile.FLAG), (revealed.delta, Tile.VISIBLE)]
+
+        replayed = gm.snapshot()
+        replayed.apply_deltas(deltas)
+        self.assertListEqual(revealed.tiles, replayed.tiles)
+        self.assertEqual(revealed.status, replayed.status)
+
+        replayed.apply_deltas(reversed(deltas))
+        self.assertListEqual(gm.tiles, replayed.tiles)
+
+    def test_apply_deltas_status(self):
+        gm = SweeperGame.from_tile_arr([
+            [1, 8, 0, 0, 0, 0],
+            [8, 8, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 8, 8],
+            [0, 0, 0, 0, 8, 1],
+            [0, 0, 0, 0, 8, 8],
+        ])
+        gm.apply_deltas([([0], Tile.VISIBLE)])
+        self.assertEqual(GameStatus.USER_LOST, gm.status)
+
+        gm.apply_deltas([([0], Tile.VISIBLE)])
+        self.assertEqual(GameStatus.IN_PROGRESS, gm.status)
+
+    def test_board_layout(self):
+        tiles = [
+            [1, 8, 0, 0, 0, 0],
+            [8, 8, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 8, 8],
+            [0, 0, 0, 0, 8, 1],
+            [0, 0, 0, 0, 8, 8],
+        ]
+        gm = SweeperGame.from_tile_arr(tiles)
+        self.assertIsInstance(gm.board, bytearray)
+        self.assertEqual(36, len(gm.board))
+        self.assertEqual(2, gm.num_mines)
+        self.assertEqual(1, gm.board[4 * 6 + 5])
+        self.assertListEqual(tiles, gm.tiles)
+
+        gm2 = SweeperGame.from_board(6, 6, gm.board)
+        self.assertListEqual(tiles, gm2.tiles)
+
+        # the board is copied, not shared
+        gm2.board[0] = 0
+        self.assertEqual(1, gm.board[0])
+
+    def test_apply_reveal_in_place(self):
+        gm = SweeperGame.from_tile_arr([
+            [0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0],
+            [8, 8, 8, 8, 8, 8],
+            [8, 1, 8, 8, 1, 8],
+            [8, 8, 8, 8, 8, 8],
+            [0, 0, 0, 0, 0, 0],
+        ])
+        snapshot = gm.snapshot()
+
+        delta = gm.apply_reveal(2, 1)
+        self.assertListEqual([13], delta)
+        self.assertEqual(10, gm.board[13])
+        self.assertEqual(8, snapshot.board[13])
+
+        delta = gm.apply_flag(3, 1)
+        self.assertListEqual([19], delta)
+        self.assertTrue(Tile.is_flag(gm.board[19]))
+        self.assertFalse(Tile.is_flag(snapshot.board[19]))
+
+        self.assertRaises(InvalidMoveException, gm.apply_reveal, 2, 1)
+        self.assertRaises(InvalidMoveException, gm.apply_flag, -1, 0)
+
+    def reference_reveal(self, gm, r, c):
+        """Straightforward flood fill built on get_neighbors_to_reveal."""
+        revealed = set()
+        stack = [(r, c)]
+        while stack:
+            rr, cc = stack.pop()
+            if (rr, cc) in revealed:
+                continue
+            revealed.add((rr, cc))
+            for n in gm.get_neighbors_to_reveal(rr, cc):
+                if n not in revealed:
+                    stack.append(n)
+        return revealed
+
+    def test_reveal_tile_matches_reference(self):
+        for r, c, m in [(6, 6, 2), (10, 12, 8), (20, 20, 30), (20, 20, 99)]:
+            gm = SweeperGame(r, c, m)
+            for i, row in enumerate(gm.tiles):
+                for j, tile in enumerate(row):
+                    if Tile.is_mine(tile):
+                        continue
+                    clone = gm.reveal_tile(i, j)
+                    expected = self.reference_reveal(gm, i, j)
+                    actual = {divmod(k, c) for k in clone.delta}
+                    self.assertSetEqual(expected, actual)
+                    self.assertEqual(len(clone.delta), len(actual))
+
+    def test_reveal_tile_large_empty_board(self):
+        gm = SweeperGame(300, 300, 0)
+        delta = gm.apply_reveal(150, 150)
+        self.assertEqual(300 * 300, len(delta))
+        self.assertEqual(GameStatus.USER_WON, gm.status)
+
+    def test_status_counters_match_check_status(self):
+        """The constant-time status must agree with a full scan
+        after every kind of move, including rewinds."""
+        for seed in range(20):
+            gm = SweeperGame(10, 10, 15)
+            rng = random.Random(seed)
+            deltas = []
+
+            while gm.status == GameStatus.IN_PROGRESS:
+                r, c = rng.randrange(10), rng.randrange(10)
+                try:
+                    if rng.random() < 0.2:
+                        delta = gm.apply_flag(r, c)
+                        deltas.append((delta, Tile.FLAG))
+                    else:
+                        delta = gm.apply_reveal(r, c)
+                        deltas.append((delta, Tile.VISIBLE))
+                except InvalidMoveException:
+                    continue
+                self.assertEqual(gm.check_status(), gm.status)
+
+            while deltas:
+                gm.apply_deltas([deltas.pop()])
+                self.assertEqual(gm.check_status(), gm.status)
+
+            self.assertEqual(GameStatus.IN_PROGRESS, gm.status)
+            self.assertEqual(100 - 15, gm.hidden_safe)
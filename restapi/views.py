@@ -1,21 +1,169 @@
 import logging
+from typing import List
+
 from rest_framework import viewsets
-from django.shortcuts import redirect
-from django.utils.timezone import now
+from rest_framework.decorators import action
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from django.db import transaction
+from django.shortcuts import redirect, get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 
-from restapi.models import Game, Move
+from restapi import const
+from restapi.filters import MoveFilter
+from restapi.models import Game, Move, Checkpoint
+from restapi.renderers import BOARD_RENDERER_CLASSES
+from restapi.fields import PackedBoard
 from restapi.serializers import GameSerializer, GameDetailSerializer, \
-    MoveSerializer, MoveDetailSerializer, MoveCreateSerializer
+    MoveSerializer, MoveDetailSerializer, MoveCreateSerializer, \
+    MoveCreateChangesSerializer, MoveBatchSerializer, tile_changes, \
+    game_detail_data, move_create_data
 
 from restapi.sweepergame import SweeperGame, GameStatus
 from restapi.exceptions import InvalidMoveException, GameOverException
 
 logger = logging.getLogger('sweeper')
 
+class VersionConflict(APIException):
+    """Raised when a game was changed by another request
+    while a move or rewind was being applied to it.
+    The response includes the game's current version.
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_code = 'conflict'
+
+    default_detail = 'The game was modified by another request.'
+
+    def __init__(self, game_id: int):
+        super(VersionConflict, self).__init__()
+        # set directly, as APIException would turn the version into a string
+        self.detail = {
+            'detail': self.detail,
+            'version': Game.objects.filter(pk=game_id).values_list(
+                'version', flat=True).first(),
+        }
+
+
+def check_version(request, game_obj: Game):
+    """Reject the request if it specifies the `version` of the game
+    it was based on, and the game has changed since then.
+
+    Raises:
+        ValidationError - if the version is not an integer.
+        VersionConflict - if the version is out of date.
+    """
+    if request.data.get('version') is None:
+        return
+
+    try:
+        version = int(request.data['version'])
+    except (TypeError, ValueError):
+        raise ValidationError('Invalid version.')
+
+    if version != game_obj.version:
+        raise VersionConflict(game_obj.id)
+
+# moves can be deleted by a rewind, but their state never changes
+IMMUTABLE_CACHE_CONTROL = 'max-age=31536000, immutable'
+# game details change with each move: always check the ETag
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+def response_etag(request, *parts) -> str:
+    """Strong ETag for a resource whose content is identified
+    by `parts`, in the format negotiated for the request."""
+    return '"%s"' % '-'.join(
+        [str(part) for part in parts] + [str(request.version), request.accepted_renderer.format])
+
+
+def strip_weak(etag: str) -> str:
+    """`etag` without its weakness indicator, if any."""
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Whether the request's If-None-Match header matches `etag`.
+    As required for If-None-Match (RFC 7232, section 3.2), the
+    comparison is weak: a `W/` prefix on either tag is ignored,
+    since proxies that compress or otherwise transform responses
+    send the ETag back as a weak one.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+
+    etag = strip_weak(etag)
+    return any(strip_weak(tag) == etag for tag in parse_etags(header))
+
+
+def cached_response(response: Response, etag: str, cache_control: str) -> Response:
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    # the content depends on the format and on the user
+    patch_vary_headers(response, ['Accept', 'Cookie'])
+    return response
+
+
+def wants_changes(request) -> bool:
+    """Whether the client asked for the tiles changed by new moves
+    instead of the whole board, with `?response=changes`."""
+    return request.query_params.get('response') == 'changes'
+
+
+def is_plain_move(data) -> bool:
+    """Whether the body of a new move has a `row`, `col` and
+    `action` that MoveCreateSerializer would accept as they are."""
+    try:
+        row, col, action = data['row'], data['col'], data['action']
+    except (KeyError, TypeError):
+        return False
+
+    return (
+        type(row) is int and 0 <= row < const.MAX_ROWS
+        and type(col) is int and 0 <= col < const.MAX_COLS
+        and action in Move.DELTA_MASKS
+    )
+
+
+def apply_move(game: SweeperGame, action: str, row: int, col: int) -> List[int]:
+    """Apply a move to `game` in place.
+
+    Returns:
+        The indices of the tiles changed by the move.
+
+    Raises:
+        ValidationError - if the move cannot be applied.
+    """
+    try:
+        if action == Move.REVEAL:
+            return game.apply_reveal(row, col)
+        elif action == Move.FLAG:
+            return game.apply_flag(row, col)
+        else:
+            raise ValidationError('Invalid action')
+    except InvalidMoveException:
+        raise ValidationError('Invalid move')
+    except GameOverException:
+        raise ValidationError('Cannot apply move to completed game')
+
+
 class GameViewSet(viewsets.ModelViewSet):
     serializer_class = GameSerializer
     detail_serializer_class = GameDetailSerializer
     http_method_names = ['get', 'post', 'head', 'options']
+    renderer_classes = BOARD_RENDERER_CLASSES
+    lookup_value_regex = r'\d+'
+    # the paginator applies the ordering
+    filter_backends = [DjangoFilterBackend]
+    cursor_orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -38,32 +186,198 @@ class GameViewSet(viewsets.ModelViewSet):
 
         serializer.save(owner=self.request.user)
 
+    @action(detail=True, methods=['post'])
+    def rewind(self, request, pk=None):
+        """Undo moves by reverting their recorded deltas.
+        Only the tiles touched by the undone moves are modified,
+        however long the game is.
+
+        The POST body may contain an `order` field: the order of
+        the last move to keep (-1 to undo every move).
+        If omitted, only the latest move is undone.
+
+        As with new moves, the body may also contain the `version`
+        of the game that the rewind is based on. The rewind is
+        rejected with a 409 response if the game has changed.
+
+        Side Effects:
+            Deletes the undone moves and any checkpoints taken
+            after them, and updates the Game model's materialized
+            state, time tracking fields and version.
+        """
+        with transaction.atomic():
+            queryset = self.filter_queryset(self.get_queryset())
+            game_obj = get_object_or_404(queryset, pk=pk)
+            check_version(request, game_obj)
+
+            try:
+                order = int(request.data.get('order', game_obj.move_count - 2))
+            except (TypeError, ValueError):
+                raise ValidationError('Invalid order.')
+
+            if game_obj.move_count == 0:
+                raise ValidationError('There are no moves to undo.')
+
+            if order < -1 or order >= game_obj.move_count:
+                raise ValidationError('Invalid order.')
+
+            undone = Move.objects.filter(
+                game_id=game_obj,
+                order__gt=order,
+            ).order_by('-order').only('action', 'delta')
+
+            game = game_obj.get_current_game()
+            game.apply_deltas(move.get_delta() for move in undone)
+
+            game_obj.current_tiles = PackedBoard.from_game(game)
+            game_obj.status = game.status.value
+            game_obj.move_count = order + 1
+            if game_obj.move_count == 0:
+                game_obj.current_tiles = None
+                game_obj.start_time = None
+            if game.status == GameStatus.IN_PROGRESS:
+                game_obj.end_time = None
+
+            if not game_obj.save_versioned(Game.STATE_FIELDS):
+                raise VersionConflict(game_obj.id)
+            game_obj.cache_game(game)
+
+            undone.delete()
+            Checkpoint.objects.filter(game_id=game_obj, order__gt=order).delete()
+
+        return Response({
+            'id': game_obj.id,
+            'move_count': game_obj.move_count,
+            'version': game_obj.version,
+            'state': {
+                'status': game_obj.status,
+                'tiles': PackedBoard.from_game(game),
+            }
+        })
+
+    def retrieve(self, request, *args, **kwargs):
+        """Same output as GameDetailSerializer, but built
+        by hand (see `game_detail_data`).
+
+        The response's ETag is derived from the game's version.
+        If it matches the request's If-None-Match header,
+        only the version is loaded and the response is a 304.
+        """
+        if request.META.get('HTTP_IF_NONE_MATCH') is not None:
+            version = self.filter_queryset(self.get_queryset()).filter(
+                pk=kwargs['pk']).values_list('version', flat=True).first()
+            etag = response_etag(request, 'game', kwargs['pk'], version)
+
+            if version is not None and etag_matches(request, etag):
+                return cached_response(
+                    Response(status=status.HTTP_304_NOT_MODIFIED),
+                    etag,
+                    REVALIDATE_CACHE_CONTROL,
+                )
+
+        game = self.get_object()
+        return cached_response(
+            Response(game_detail_data(game)),
+            response_etag(request, 'game', game.id, game.version),
+            REVALIDATE_CACHE_CONTROL,
+        )
+
     def get_queryset(self):
-        return Game.objects.filter(owner=self.request.user)
+        queryset = Game.objects.filter(owner=self.request.user)
+
+        # don't load boards that the response won't include
+        if self.action == 'list':
+            return queryset.only(*GameSerializer.Meta.fields)
+        if self.action == 'retrieve':
+            return queryset.defer('current_tiles')
+        if self.action == 'rewind':
+            return queryset.defer(*Game.BOARD_FIELDS)
+        return queryset
 
 
 class MoveViewSet(viewsets.ModelViewSet):
     serializer_class = MoveSerializer
     detail_serializer_class = MoveDetailSerializer
     create_serializer_class = MoveCreateSerializer
-    filterset_fields = ['game_id']
+    create_changes_serializer_class = MoveCreateChangesSerializer
+    filterset_class = MoveFilter
+    filter_backends = [DjangoFilterBackend]
+    cursor_orderings = {
+        'order': ('game_id_id', 'order'),
+        '-order': ('-game_id_id', '-order'),
+    }
     http_method_names = ['get', 'post', 'head', 'options']
+    renderer_classes = BOARD_RENDERER_CLASSES
+    lookup_value_regex = r'\d+'
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
             if hasattr(self, 'detail_serializer_class'):
                 return self.detail_serializer_class
         elif self.action == 'create':
+            if wants_changes(self.request):
+                return self.create_changes_serializer_class
             if hasattr(self, 'create_serializer_class'):
                 return self.create_serializer_class
 
         return super(MoveViewSet, self).get_serializer_class()
 
-    def perform_create(self, serializer):
+    def retrieve(self, request, *args, **kwargs):
+        """The state after a move never changes, so the response
+        can be cached for good. If the request's If-None-Match
+        header matches, the state is not rebuilt: only the move's
+        existence is checked and the response is a 304.
+        """
+        etag = response_etag(request, 'move', kwargs['pk'])
+
+        if etag_matches(request, etag) and self.filter_queryset(
+                self.get_queryset()).filter(pk=kwargs['pk']).exists():
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super(MoveViewSet, self).retrieve(request, *args, **kwargs)
+
+        return cached_response(response, etag, IMMUTABLE_CACHE_CONTROL)
+
+    def create(self, request, *args, **kwargs):
+        """
+        The response contains the whole board after the move, or
+        with the `response=changes` query parameter, only the
+        [index, value] pairs of the tiles changed by the move.
+
+        Requests that are valid JSON moves skip the serializer,
+        and their response is built by `move_create_data`.
+        Anything else goes through the serializer, so that
+        invalid fields are reported in the usual way.
         """
+        if not is_plain_move(request.data):
+            return super(MoveViewSet, self).create(request, *args, **kwargs)
+
+        move = self.make_move()
+        return Response(
+            move_create_data(move, wants_changes(request)),
+            status=status.HTTP_201_CREATED,
+        )
+
+    def perform_create(self, serializer):
+        serializer.instance = self.make_move()
+
+    def make_move(self) -> Move:
+        """Apply the move in the request to its game.
+
         Side Effects:
-            Updates Game model's `end_time` field if the
-            move results in the game being finished.
+            Updates the Game model's materialized state
+            (`current_tiles`, `status`, `move_count`) and,
+            if the move results in the game being started or
+            finished, its `start_time` or `end_time` field.
+            The move's order is the game's `move_count`.
+
+            Only the owner of the game can make moves in it:
+            other users get a 404 response.
+
+            No lock is held while the move is applied. If the game
+            changes in the meantime, or the POST body contains a
+            `version` other than the game's current version,
+            the move is rejected with a 409 response.
         """
 
         try:
@@ -71,63 +385,148 @@ class MoveViewSet(viewsets.ModelViewSet):
             row = int(self.request.data['row'])
             col = int(self.request.data['col'])
             action = self.request.data['action']
-        except ValueError:
+        except (KeyError, TypeError, ValueError):
             raise ValidationError('Missing required field.')
 
         logger.debug('gid=%d, r=%d, c=%d, a=%s', game_id, row, col, action)
 
-        try:
-            game_obj = Game.objects.get(pk=game_id)
-        except Exception:
-            raise ValidationError('Specified game_id does not exist.')
+        with transaction.atomic():
+            game_obj = get_object_or_404(
+                Game.objects.defer(*Game.BOARD_FIELDS), pk=game_id, owner=self.request.user)
 
-        logger.debug('got game objejct')
+            check_version(self.request, game_obj)
 
-        move_history = Move.objects.filter(
-            game_id=game_obj
-        ).order_by('order')
+            game = game_obj.get_current_game()
+            delta = apply_move(game, action, row, col)
 
-        game = SweeperGame.from_tile_arr(game_obj.tiles)
+            order = game_obj.record_move(game)
+            if not game_obj.save_versioned(Game.STATE_FIELDS):
+                raise VersionConflict(game_id)
+            game_obj.cache_game(game)
 
-        try:
-            for move in move_history:
-
-                if move.action == 'R':
-                    game = game.reveal_tile(move.row, move.col)
-                elif move.action == 'F':
-                    game = game.set_flag(move.row, move.col)
-                else:
-                    # this should never logically happen.
-                    # Therefore, if it does, we return 500.
-                    logger.exception('Unexpected move action: %s', move.action)
-                    raise Exception('Invalid action')
-
-            # after all previous moves have been applied,
-            # we try applying the new one that was provided in the request
-            if action == 'R':
-                game = game.reveal_tile(row, col)
-            elif action == 'F':
-                game = game.set_flag(row, col)
-            else:
-                raise ValidationError('Invalid action')
-
-        except InvalidMoveException:
-            raise ValidationError('Invalid move')
-        except GameOverException:
-            raise ValidationError('Cannot apply move to completed game')
-
-        if game_obj.end_time is None and \
-            game.status != GameStatus.IN_PROGRESS:
-            logger.debug('Game is over. Updating end_time on model.')
-            game_obj.end_time = now()
-            game_obj.save()
-
-        r, c = self.request.data['row'], self.request.data['col']
-        logger.debug('saving move %d, %d', r, c)
-        serializer.save(owner=self.request.user)
+            logger.debug('saving move %d, %d', row, col)
+            move = Move.objects.create(
+                owner=self.request.user,
+                game_id=game_obj,
+                order=order,
+                row=row,
+                col=col,
+                action=action,
+                delta=delta,
+            )
+
+            if Checkpoint.is_due(move.order):
+                Checkpoint.objects.create(
+                    game_id=game_obj,
+                    order=move.order,
+                    tiles=game_obj.current_tiles,
+                )
+
+        return move
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply a list of moves to a game, in order, in a single
+        transaction. The moves are all rejected if any of them
+        is invalid.
+
+        The POST body contains the `game_id`, the list of `moves`
+        (each with a `row`, `col` and `action`) and optionally
+        the `version` of the game that the moves are based on.
+        Only the owner of the game can make moves in it: other
+        users get a 404 response.
+
+        By default the response contains the final state of the
+        game. With the `response=changes` query parameter it
+        contains the tiles changed by each move instead.
+
+        Side Effects:
+            Same as creating each move separately.
+        """
+        serializer = MoveBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        game_id = serializer.validated_data['game_id']
+        moves = serializer.validated_data['moves']
+        with_changes = wants_changes(request)
+
+        with transaction.atomic():
+            game_obj = get_object_or_404(
+                Game.objects.defer(*Game.BOARD_FIELDS), pk=game_id, owner=request.user)
+
+            check_version(request, game_obj)
+
+            game = game_obj.get_current_game()
+            first_order = game_obj.move_count
+            new_moves = []
+            checkpoints = []
+            changes = []
+
+            for i, data in enumerate(moves):
+                try:
+                    delta = apply_move(game, data['action'], data['row'], data['col'])
+                except ValidationError as exc:
+                    raise ValidationError({'moves': {i: exc.detail}})
+
+                order = first_order + i
+                new_moves.append(Move(
+                    owner=request.user,
+                    game_id=game_obj,
+                    order=order,
+                    delta=delta,
+                    **data,
+                ))
+
+                if with_changes:
+                    changes.append(tile_changes(game.board, delta))
+
+                if Checkpoint.is_due(order):
+                    checkpoints.append(Checkpoint(
+                        game_id=game_obj,
+                        order=order,
+                        tiles=PackedBoard.from_game(game),
+                    ))
+
+            game_obj.record_move(game, len(new_moves))
+            if not game_obj.save_versioned(Game.STATE_FIELDS):
+                raise VersionConflict(game_id)
+            game_obj.cache_game(game)
+
+            Move.objects.bulk_create(new_moves)
+            Checkpoint.objects.bulk_create(checkpoints)
+
+        results = [{
+            'id': move.id,
+            'order': move.order,
+            'row': move.row,
+            'col': move.col,
+            'action': move.action,
+        } for move in new_moves]
+
+        state = {'status': game_obj.status}
+        if with_changes:
+            for result, move_changes in zip(results, changes):
+                result['changes'] = move_changes
+        else:
+            state['tiles'] = game_obj.current_tiles
+
+        return Response({
+            'game_id': game_obj.id,
+            'move_count': game_obj.move_count,
+            'version': game_obj.version,
+            'moves': results,
+            'state': state,
+        }, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
-        return Move.objects.filter(owner=self.request.user)
+        queryset = Move.objects.filter(owner=self.request.user)
+
+        if self.action == 'list':
+            return queryset.only(*MoveSerializer.Meta.fields)
+        if self.action == 'retrieve':
+            # the state is rebuilt from the game's initial board
+            return queryset.select_related('game_id').defer(
+                'delta', 'game_id__current_tiles')
+        return queryset
 
 def index(request):
     return redirect('/static/client.html')
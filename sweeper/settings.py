@@ -194,7 +194,7 @@ LOGGING = {
 
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'restapi.pagination.KeysetPagination',
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.AcceptHeaderVersioning',
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
@@ -212,4 +212,46 @@ REST_FRAMEWORK = {
     'DEFAULT_VERSION': '1.0',
     'ALLOWED_VERSIONS': ['1.0'],
     'PAGE_SIZE': 100,
-}
\ No newline at end of file
+}
+
+# Sweeper
+
+# Take a snapshot of the board every this many moves.
+# Rebuilding the state after any move then replays
+# at most SWEEPER_CHECKPOINT_INTERVAL-1 moves.
+SWEEPER_CHECKPOINT_INTERVAL = int(os.environ.get('SWEEPER_CHECKPOINT_INTERVAL', '25'))
+
+# Each worker process keeps the latest state of up to this many
+# games in memory, using at most SWEEPER_GAME_CACHE_MAX_BYTES for
+# their boards. Set SWEEPER_GAME_CACHE_SIZE to 0 to disable it.
+SWEEPER_GAME_CACHE_SIZE = int(os.environ.get('SWEEPER_GAME_CACHE_SIZE', '1024'))
+SWEEPER_GAME_CACHE_MAX_BYTES = int(os.environ.get('SWEEPER_GAME_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+# Disables the shared game cache below in tests.
+TEST_RUNNER = 'restapi.tests.runner.SweeperTestRunner'
+
+# Cache shared by the worker processes: game states are written
+# through to it after every move, so that a move handled by a
+# different worker than the previous one need not load the board
+# from the database. It is only enabled when DJANGO_REDIS_URL is set
+# (e.g. redis://redis:6379/0): an in-memory cache would not be shared
+# between processes, and would only add a write to every move.
+SWEEPER_SHARED_GAME_CACHE = 'games' if os.environ.get('DJANGO_REDIS_URL') else None
+SWEEPER_SHARED_GAME_CACHE_TIMEOUT = int(os.environ.get('SWEEPER_SHARED_GAME_CACHE_TIMEOUT', '3600'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if SWEEPER_SHARED_GAME_CACHE:
+    CACHES[SWEEPER_SHARED_GAME_CACHE] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        'TIMEOUT': SWEEPER_SHARED_GAME_CACHE_TIMEOUT,
+        'OPTIONS': {
+            # an unavailable cache only means more database queries
+            'IGNORE_EXCEPTIONS': True,
+        },
+    }